@@ -4,7 +4,7 @@ Vérifie que tous les prérequis sont installés et configurés correctement.
 """
 import sys
 import os
-from dotenv import load_dotenv
+import importlib.util
 
 def check_python():
     """Vérifie que la version de Python est compatible (3.10 ou 3.11)."""
@@ -18,13 +18,16 @@ def check_python():
 
 def check_env():
     """Vérifie que le fichier .env existe et contient la clé API Google."""
-    if not os.path.exists(".env"):
-        print("❌ Fichier .env manquant")
+    from dotenv import load_dotenv
+    
+    # load_dotenv renvoie False si le fichier est absent (ou vide) :
+    # pas besoin d'un os.path.exists préalable
+    if not load_dotenv(".env"):
+        print("❌ Fichier .env manquant ou vide")
         print("   Action: Créez un fichier .env et ajoutez votre GOOGLE_API_KEY")
         print("   Exemple: GOOGLE_API_KEY=AIzaSy...")
         return False
     
-    load_dotenv()
     api_key = os.getenv("GOOGLE_API_KEY")
     
     if not api_key:
@@ -59,11 +62,15 @@ def check_packages():
         ("pytest", "pytest"),
     ]
     
+    # find_spec localise le module sans l'exécuter (pas de chargement du SDK)
     missing = []
     for module_name, package_name in required_packages:
         try:
-            __import__(module_name)
-        except ImportError:
+            spec = importlib.util.find_spec(module_name)
+        except ModuleNotFoundError:
+            # Package parent absent (ex: "google" pour google.generativeai)
+            spec = None
+        if spec is None:
             missing.append(package_name)
     
     if missing:
@@ -79,16 +86,14 @@ def main():
     print("🔍 Vérification de l'environnement de développement...")
     print("=" * 60)
     
-    checks = [
-        check_python(),
-        check_packages(),
-        check_env(),
-        check_dirs()
-    ]
+    # all() s'arrête au premier échec : inutile de vérifier les packages
+    # ou le .env avec une version de Python incompatible
+    checks = (check_python, check_packages, check_env, check_dirs)
+    ok = all(check() for check in checks)
     
     print("=" * 60)
     
-    if all(checks):
+    if ok:
         print("\n🚀 Environnement prêt! Vous pouvez lancer le système avec:")
         print("   python main.py --target_dir ./sandbox")
         return 0
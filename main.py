@@ -5,7 +5,11 @@ Ce fichier DOIT s'appeler main.py selon les spécifications du TP.
 import argparse
 import os
 import sys
-from src.swarm import RefactoringSwarm
+from itertools import islice
+from src.tools.file_handler import iter_python_files
+
+# Au-delà, le nombre exact de fichiers n'influence plus rien (workers par défaut)
+MAX_DEFAULT_WORKERS = 8
 
 def main():
     """
@@ -23,26 +27,53 @@ def main():
         help="Répertoire contenant le code à analyser et corriger (par défaut: sandbox)"
     )
     
+    parser.add_argument(
+        "--workers", "--max_workers",
+        dest="workers",
+        type=int,
+        default=None,
+        help="Nombre de fichiers corrigés en parallèle, 1 pour un traitement "
+             "séquentiel (par défaut: min(8, nombre de fichiers))"
+    )
+    
+    parser.add_argument(
+        "--max_total_calls",
+        type=int,
+        default=None,
+        help="Nombre maximal d'appels aux agents sur toute l'exécution (par défaut: illimité)"
+    )
+    
     args = parser.parse_args()
     
-    # Vérification que le répertoire existe
+    # Recherche des fichiers Python (échoue si le répertoire n'existe pas)
     abs_target = os.path.abspath(args.target_dir)
-    if not os.path.isdir(abs_target):
+    try:
+        # Compter au plus MAX_DEFAULT_WORKERS fichiers suffit : le parcours s'arrête là
+        py_count = sum(1 for _ in islice(iter_python_files(abs_target), MAX_DEFAULT_WORKERS))
+    except (FileNotFoundError, NotADirectoryError):
         print(f"❌ Erreur: Le répertoire '{abs_target}' n'existe pas")
         sys.exit(1)
     
-    # Vérification qu'il y a au moins un fichier Python dans le répertoire
-    py_files = []
-    for root, _, files in os.walk(abs_target):
-        py_files.extend([f for f in files if f.endswith('.py')])
-    
-    if not py_files:
+    # Sans fichier Python, rien à corriger : inutile d'initialiser les agents
+    if not py_count:
         print(f"⚠️  Avertissement: Aucun fichier Python trouvé dans {abs_target}")
-        print("Le système va quand même s'exécuter, mais il n'y aura rien à corriger.")
+        print("Rien à corriger, arrêt.")
+        return
+    
+    # Les corrections sont limitées par le réseau (appels Groq) : des threads
+    # suffisent, un pool de processus ne ferait que recréer les clients Groq
+    workers = args.workers if args.workers is not None else py_count
+    workers = max(1, workers)
+    
+    # Import différé : les agents (client Groq, prompts) ne sont chargés
+    # qu'une fois les arguments validés, pour que --help reste instantané
+    from src.swarm import RefactoringSwarm
     
     # Lancement du swarm
     try:
-        swarm = RefactoringSwarm(abs_target)
+        swarm = RefactoringSwarm(
+            abs_target, workers=workers, max_total_calls=args.max_total_calls
+        )
         swarm.run()
     except KeyboardInterrupt:
         print("\n\n⚠️  Interruption par l'utilisateur (Ctrl+C)")
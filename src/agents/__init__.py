@@ -1,8 +1,39 @@
 """
 Agents package - AI agents for code analysis and refactoring
 """
-from .auditor import AuditorAgent
-from .fixer import FixerAgent
-from .judge import JudgeAgent
+from functools import lru_cache
+from importlib import import_module
 
-__all__ = ['AuditorAgent', 'FixerAgent', 'JudgeAgent']
\ No newline at end of file
+__all__ = ['AuditorAgent', 'FixerAgent', 'JudgeAgent', 'get_agent']
+
+# Import paresseux (PEP 562) : importer un seul agent ne charge plus les
+# deux autres (client Groq, lecture des prompts)
+_AGENT_MODULES = {
+    'AuditorAgent': '.auditor',
+    'FixerAgent': '.fixer',
+    'JudgeAgent': '.judge',
+}
+
+
+def __getattr__(name):
+    if name in _AGENT_MODULES:
+        value = getattr(import_module(_AGENT_MODULES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@lru_cache(maxsize=None)
+def get_agent(name: str):
+    """
+    Retourne l'instance partagée d'un agent, créée au premier appel.
+    Tous les appelants d'un même processus réutilisent ainsi le même agent
+    (client Groq, caches d'audit et de tests).
+    
+    Args:
+        name: Nom de la classe de l'agent (ex: "AuditorAgent")
+        
+    Returns:
+        Instance de l'agent
+    """
+    return __getattr__(name)()
\ No newline at end of file
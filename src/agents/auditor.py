@@ -2,19 +2,81 @@
 Agent Auditeur - Analyse le code pour détecter les problèmes.
 Utilise Groq (Llama) pour une analyse intelligente du code Python.
 """
+import hashlib
+import io
 import os
 import json
-import re
+from concurrent.futures import ThreadPoolExecutor
 from string import Template
-from groq import Groq
-from dotenv import load_dotenv
-from src.utils.logger import log_experiment, ActionType
+from functools import cached_property, lru_cache
+from src.utils.logger import log_experiment, ActionType, DEBUG_EXPERIMENTS
+from src.utils.groq_client import get_groq_client, load_env
+from src.utils.llm_cache import LLMCache
+from src.utils.llm_parse import extract_json_array
+from src.utils.prompts import load_prompt
+from src.utils import fast_json
+from src.tools.file_handler import list_python_files
 
-load_dotenv()
+load_env()
 
-# Chargement du prompt système
-with open("prompts/auditor_prompt.txt", "r", encoding="utf-8") as f:
-    AUDITOR_PROMPT_TEXT = f.read()
+# Nombre maximal de lectures de fichiers menées en parallèle
+MAX_READ_WORKERS = 32
+
+# Les instructions, identiques à chaque appel, forment le message système ;
+# seul le code à analyser part dans le message utilisateur. Le préfixe
+# commun peut ainsi être mis en cache côté fournisseur
+@lru_cache(maxsize=4)
+def _system_prompt_from(prompt_text: str) -> str:
+    """Construit le message système à partir du texte du prompt (une fois par version)."""
+    return prompt_text.replace("{code}", "(fourni dans le message de l'utilisateur)")
+
+def _auditor_system_prompt() -> str:
+    """Retourne le message système de l'auditeur (prompt lu au premier appel)."""
+    return _system_prompt_from(load_prompt("auditor_prompt.txt"))
+
+def _syntax_issue(filename: str, content: str):
+    """
+    Détecte localement une erreur de syntaxe, sans appel au modèle.
+    
+    Args:
+        filename: Nom du fichier (tel qu'il apparaît dans "# FILE:")
+        content: Code source du fichier
+        
+    Returns:
+        Problème au format de l'auditeur, ou None si le fichier compile
+    """
+    try:
+        compile(content, filename, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        issue_type = "INDENTATION_ERROR" if isinstance(e, IndentationError) else "SYNTAX_ERROR"
+        description = f"Erreur détectée par le compilateur Python: {e.msg}"
+        if e.text and e.text.strip():
+            description += f" (dans: {e.text.strip()})"
+        return {
+            "file": filename,
+            "line": e.lineno or 1,
+            "issue_type": issue_type,
+            "description": description
+        }
+    except ValueError as e:
+        # Octets nuls dans le fichier
+        return {"file": filename, "line": 1, "issue_type": "SYNTAX_ERROR", "description": str(e)}
+    return None
+
+def _merge_issues(local_issues: list, llm_json: str) -> str:
+    """
+    Ajoute les problèmes détectés localement à la réponse (déjà validée) du modèle.
+    
+    Args:
+        local_issues: Problèmes détectés sans appel au modèle
+        llm_json: Tableau JSON retourné par le modèle
+        
+    Returns:
+        Tableau JSON de l'ensemble des problèmes
+    """
+    if not local_issues:
+        return llm_json
+    return fast_json.dumps(local_issues + fast_json.loads(llm_json))
 
 class AuditorAgent:
     """
@@ -23,9 +85,17 @@ class AuditorAgent:
     """
     
     def __init__(self):
-        """Initialise l'agent avec le client Groq et le modèle Llama."""
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        """Initialise l'agent avec le modèle Llama (le client Groq est créé à la demande)."""
         self.model_name = "llama-3.3-70b-versatile"
+        # Audits réussis entre exécutions : empreinte (modèle + prompt) -> réponse
+        self._audit_cache = LLMCache("audit")
+        # Dernier audit par répertoire : (empreinte des fichiers, résultat)
+        self._last_audits = {}
+
+    @cached_property
+    def client(self):
+        """Client Groq partagé, créé au premier appel au modèle."""
+        return get_groq_client()
 
     def analyze(self, target_dir: str) -> str:
         """
@@ -40,38 +110,92 @@ class AuditorAgent:
         print(f"  📂 Collecte des fichiers Python dans {target_dir}...")
         
         # Collecte de tous les fichiers Python non-test
-        code_snippets = []
-        for root, _, files in os.walk(target_dir):
-            for file in files:
-                if file.endswith(".py") and not file.startswith("test_"):
-                    path = os.path.join(root, file)
-                    try:
-                        with open(path, "r", encoding="utf-8") as f:
-                            content = f.read()
-                            if content.strip():
-                                code_snippets.append(f"# FILE: {file}\n{content}")
-                    except Exception as e:
-                        print(f"  ⚠️  Erreur lecture {file}: {e}")
-        
-        if not code_snippets:
-            print("  ℹ️  Aucun fichier Python trouvé")
-            return "[]"
-        
-        print(f"  📄 {len(code_snippets)} fichier(s) à analyser")
-        
-        # Préparation du prompt avec tout le code
-        full_code = "\n\n".join(code_snippets)
-        
-        # Remplacement du placeholder {code} dans le prompt
-        prompt = AUDITOR_PROMPT_TEXT.replace("{code}", full_code)
+        try:
+            paths = [
+                path for path in list_python_files(target_dir)
+                if not os.path.basename(path).startswith("test_")
+            ]
+        except OSError:
+            # Répertoire cible illisible ou absent : aucun fichier à analyser
+            paths = []
+        
+        # Fichiers inchangés (chemins, dates, tailles) depuis le dernier audit
+        # de ce répertoire : résultat réutilisé sans relire ni réassembler le code
+        fingerprint = self._stat_fingerprint(paths)
+        last_audit = self._last_audits.get(target_dir)
+        if fingerprint is not None and last_audit and last_audit[0] == fingerprint:
+            print("  ♻️  Fichiers inchangés depuis le dernier audit, réutilisation du résultat")
+            return last_audit[1]
+        
+        # Préparation du prompt : les sections "# FILE:" sont écrites dans un
+        # seul tampon, au fil des lectures, sans liste intermédiaire ni copie lors d'un join
+        # Un fichier qui ne compile pas est signalé par le compilateur Python,
+        # en quelques millisecondes : il n'est pas envoyé au modèle, le correcteur
+        # réécrit le fichier et le juge signale les problèmes restants
+        buffer = io.StringIO()
+        files_analyzed = 0
+        local_issues = []
+        for path, content in self._iter_sources(paths):
+            filename = os.path.basename(path)
+            issue = _syntax_issue(filename, content)
+            if issue is not None:
+                local_issues.append(issue)
+                continue
+            if files_analyzed:
+                buffer.write("\n\n")
+            buffer.write("# FILE: ")
+            buffer.write(filename)
+            buffer.write("\n")
+            buffer.write(content)
+            files_analyzed += 1
+        
+        if local_issues:
+            print(f"  ⚡ {len(local_issues)} erreur(s) de syntaxe détectée(s) localement")
+        
+        if not files_analyzed:
+            if not local_issues:
+                print("  ℹ️  Aucun fichier Python trouvé")
+                return "[]"
+            # Tous les fichiers ont été traités localement : pas d'appel à Groq
+            result = fast_json.dumps(local_issues)
+            log_experiment(
+                agent_name="AuditorAgent",
+                model_used="compile",
+                action=ActionType.ANALYSIS,
+                details={
+                    "target_dir": target_dir,
+                    "input_prompt": f"Compile {len(local_issues)} fichier(s)",
+                    "output_response": result,
+                    "files_analyzed": 0
+                }
+            )
+            return self._remember(target_dir, fingerprint, result)
+        
+        print(f"  📄 {files_analyzed} fichier(s) à analyser")
+        full_code = buffer.getvalue()
+        system_prompt = _auditor_system_prompt()
+        
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": full_code},
+        ]
+        # Code inchangé depuis le dernier audit : on réutilise la réponse
+        # au lieu de refaire un appel à Groq
+        cache_key = LLMCache.key(self.model_name, system_prompt, full_code)
+        cached = self._audit_cache.get(cache_key)
+        if cached is not None:
+            print("  ♻️  Code inchangé depuis un audit précédent, réutilisation du résultat")
+            return self._remember(target_dir, fingerprint, _merge_issues(local_issues, cached))
         
         try:
             # Appel à l'API Groq avec le modèle Llama
-            print("  🤖 Envoi de la requête à Groq (Llama)...")
-            print(f"  📝 Extrait du code envoyé (50 premiers caractères): {full_code[:50]}...")
+            print(
+                "  🤖 Envoi de la requête à Groq (Llama)...\n"
+                f"  📝 Extrait du code envoyé (50 premiers caractères): {full_code[:50]}..."
+            )
             
             response = self.client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
+                messages=messages,
                 model=self.model_name,
                 temperature=0.1  # Basse température pour plus de cohérence
             )
@@ -82,37 +206,49 @@ class AuditorAgent:
             # Nettoyage de la réponse
             cleaned = self._clean_json_response(raw_response)
             
-            # Validation du JSON
+            # Validation du JSON : seule une liste valide est mise en cache
+            valid = False
             try:
-                issues = json.loads(cleaned)
+                issues = fast_json.loads(cleaned)
                 if not isinstance(issues, list):
                     print("  ⚠️  Réponse non-liste, utilisation de []")
                     cleaned = "[]"
                 else:
+                    valid = True
                     print(f"  ✅ {len(issues)} problème(s) détecté(s)")
                     # Afficher les premiers problèmes détectés
-                    if len(issues) > 0:
+                    if issues:
                         print(f"  🔍 Premier problème: {issues[0]}")
             except json.JSONDecodeError as e:
-                print(f"  ⚠️  JSON invalide de l'auditeur: {e}")
-                print(f"  📝 Réponse nettoyée (200 premiers caractères): {cleaned[:200]}...")
+                print(
+                    f"  ⚠️  JSON invalide de l'auditeur: {e}\n"
+                    f"  📝 Réponse nettoyée (200 premiers caractères): {cleaned[:200]}..."
+                )
                 cleaned = "[]"
             
             # Logging pour l'analyse scientifique
+            details = {
+                "target_dir": target_dir,
+                "input_prompt": full_code,  # Partie variable du prompt, tronquée par le logger
+                "output_response": cleaned,
+                "files_analyzed": files_analyzed
+            }
+            if DEBUG_EXPERIMENTS:
+                details["raw_response_preview"] = raw_response[:500]
             log_experiment(
                 agent_name="AuditorAgent",
                 model_used=self.model_name,
                 action=ActionType.ANALYSIS,
-                details={
-                    "target_dir": target_dir,
-                    "input_prompt": prompt[:1000],  # Tronqué pour le log
-                    "output_response": cleaned,
-                    "files_analyzed": len(code_snippets),
-                    "raw_response_preview": raw_response[:500]
-                }
+                details=details
             )
             
-            return cleaned
+            result = _merge_issues(local_issues, cleaned)
+            if not valid:
+                # Réponse inexploitable : ni cache disque ni mémo, le prochain
+                # audit du même code interrogera de nouveau le modèle
+                return result
+            self._audit_cache.put(cache_key, cleaned)
+            return self._remember(target_dir, fingerprint, result)
             
         except Exception as e:
             print(f"  ❌ Erreur lors de l'analyse: {e}")
@@ -122,13 +258,98 @@ class AuditorAgent:
                 action=ActionType.ANALYSIS,
                 details={
                     "target_dir": target_dir,
-                    "input_prompt": prompt[:1000] if 'prompt' in locals() else "ERROR: prompt not created",
+                    "input_prompt": full_code,
                     "output_response": f"ERROR: {str(e)}",
-                    "files_analyzed": len(code_snippets)
+                    "files_analyzed": files_analyzed
                 },
                 status="FAILED"
             )
-            return "[]"
+            return _merge_issues(local_issues, "[]")
+
+    def _stat_fingerprint(self, paths: list):
+        """
+        Empreinte des fichiers à analyser, calculée à partir de leurs métadonnées
+        (chemin, date de modification, taille) : aucun contenu n'est lu.
+        
+        Args:
+            paths: Chemins des fichiers à analyser
+            
+        Returns:
+            Empreinte hexadécimale, ou None si un fichier ne peut pas être examiné
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            for path in paths:
+                stat = os.stat(path)
+                digest.update(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode("utf-8"))
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def _remember(self, target_dir: str, fingerprint, result: str) -> str:
+        """
+        Mémorise le résultat d'un audit réussi pour les itérations suivantes.
+        
+        Args:
+            target_dir: Répertoire analysé
+            fingerprint: Empreinte des fichiers (None : rien n'est mémorisé)
+            result: Résultat de l'audit
+            
+        Returns:
+            result, inchangé
+        """
+        if fingerprint is not None:
+            self._last_audits[target_dir] = (fingerprint, result)
+        return result
+
+    def _iter_sources(self, paths: list):
+        """
+        Lit les fichiers à analyser et produit leur contenu au fur et à mesure.
+        Les lectures indépendantes (limitées par les I/O) sont menées en
+        parallèle ; map conserve l'ordre des fichiers.
+        
+        Args:
+            paths: Chemins des fichiers à lire
+            
+        Yields:
+            Tuples (chemin, contenu), fichiers vides ou illisibles exclus
+        """
+        if len(paths) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(paths))) as executor:
+                for path, content in zip(paths, executor.map(self._read_source, paths)):
+                    if content is not None:
+                        yield path, content
+        else:
+            for path in paths:
+                content = self._read_source(path)
+                if content is not None:
+                    yield path, content
+
+    def _read_source(self, path: str):
+        """
+        Lit un fichier source à analyser.
+        
+        Args:
+            path: Chemin du fichier à lire
+            
+        Returns:
+            Contenu du fichier, ou None s'il est vide ou illisible
+        """
+        # Lecture binaire en un bloc, décodée une seule fois (et seulement si
+        # le fichier n'est pas vide) plutôt qu'un décodage incrémental
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            if not data.strip():
+                return None
+            content = data.decode("utf-8")
+        except Exception as e:
+            print(f"  ⚠️  Erreur lecture {os.path.basename(path)}: {e}")
+            return None
+        # Fins de ligne normalisées comme en mode texte
+        if "\r" in content:
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        return content
 
     def _clean_json_response(self, response: str) -> str:
         """
@@ -141,21 +362,5 @@ class AuditorAgent:
         Returns:
             JSON nettoyé sous forme de string
         """
-        cleaned = response.strip()
-        
-        # Suppression des blocs de code markdown que Llama ajoute souvent
-        if "```json" in cleaned:
-            cleaned = cleaned.split("```json")[1].split("```")[0]
-        elif "```" in cleaned:
-            parts = cleaned.split("```")
-            if len(parts) >= 3:
-                cleaned = parts[1]
-        
-        cleaned = cleaned.strip()
-        
-        # Si la réponse contient du texte avant/après le JSON, extraire le JSON
-        json_match = re.search(r'\[.*\]', cleaned, re.DOTALL)
-        if json_match:
-            cleaned = json_match.group(0)
-        
-        return cleaned
\ No newline at end of file
+        # Blocs markdown puis texte avant/après le JSON retirés
+        return extract_json_array(response)
\ No newline at end of file
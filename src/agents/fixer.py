@@ -7,51 +7,154 @@ import json
 import os
 import ast
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from string import Template
-from groq import Groq
-from dotenv import load_dotenv
-from src.utils.logger import log_experiment, ActionType
-from src.tools.file_handler import safe_write_file
+from functools import cached_property, lru_cache
+from src.utils.logger import log_experiment, ActionType, DEBUG_EXPERIMENTS
+from src.utils.groq_client import get_groq_client, load_env
+from src.utils.llm_cache import LLMCache
+from src.utils.llm_parse import strip_code_fences
+from src.utils.prompts import load_prompt
+from src.utils import fast_json
+from src.tools.file_handler import safe_write_file_batch, list_python_files
 
-load_dotenv()
+load_env()
 
-# Chargement du prompt système
-with open("prompts/fixer_prompt.txt", "r", encoding="utf-8") as f:
-    FIXER_PROMPT = Template(f.read())
+# Les règles, identiques à chaque appel, forment le message système ; les
+# problèmes et le code, propres à chaque fichier, le message utilisateur.
+# Le préfixe commun peut ainsi être mis en cache côté fournisseur
+def _fixer_system_prompt() -> str:
+    """Retourne le message système du correcteur (prompt lu au premier appel)."""
+    return load_prompt("fixer_prompt.txt")
 
+@lru_cache(maxsize=4)
+def _user_template_from(prompt_text: str) -> Template:
+    """Construit le gabarit du message utilisateur (une fois par version du prompt)."""
+    return Template(prompt_text)
 
-def _extract_expected_names_from_issues(issues: list, target_dir: str, filename: str) -> str:
+def _fixer_user_template() -> Template:
+    """Retourne le gabarit du message utilisateur (prompt lu au premier appel)."""
+    return _user_template_from(load_prompt("fixer_user_prompt.txt"))
+
+# Expressions régulières compilées une seule fois au chargement du module
+_CANNOT_IMPORT_RE = re.compile(r"cannot import name ['\"]([a-zA-Z_][a-zA-Z0-9_]*)['\"]")
+_IMPORT_ERROR_RE = re.compile(r"ImportError[^:]*['\"]([a-zA-Z_][a-zA-Z0-9_]*)['\"]")
+
+# Plafond de la réponse : le fichier corrigé fait à peu près la taille de
+# l'original. Le code Python compte souvent plus de 0.3 token par caractère
+# (indentation, symboles) : le plafond en prévoit 0.5, plus une marge pour
+# les ajouts. Une réponse coupée par ce plafond est de toute façon rejetée
+FIX_TOKENS_PER_CHAR = 0.5
+FIX_TOKENS_MARGIN = 512
+
+
+def _imported_names(test_content: str, module_name: str) -> set:
+    """
+    Relève, par analyse de l'AST, les noms du module utilisés par un test :
+    "from module import x, y" (y compris sur plusieurs lignes entre
+    parenthèses et avec alias) et "import module [as m]" suivi de m.x.
+
+    Args:
+        test_content: Code source du fichier de test
+        module_name: Nom du module testé (ex: messy_code)
+
+    Returns:
+        Ensemble des noms attendus dans le module (vide si le test ne se parse pas)
+    """
+    try:
+        tree = ast.parse(test_content)
+    except (SyntaxError, ValueError):
+        return set()
+
+    names = set()
+    module_aliases = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module == module_name:
+            # "from m import add as plus" : c'est "add" que le module doit définir
+            names.update(alias.name for alias in node.names if alias.name != "*")
+        elif isinstance(node, ast.Import):
+            module_aliases.update(
+                alias.asname or alias.name for alias in node.names if alias.name == module_name
+            )
+
+    if module_aliases:
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+                    and node.value.id in module_aliases):
+                names.add(node.attr)
+    return names
+
+
+@lru_cache(maxsize=256)
+def _syntax_error(code: str):
+    """
+    Compile le code sans l'exécuter : la syntaxe est vérifiée sans construire
+    d'arbre ast en objets Python, et les erreurs détectées à la compilation
+    (ex: return hors d'une fonction) sont aussi signalées. Le résultat est
+    mémorisé, une réponse identique à une réponse déjà validée (fréquent en
+    fin de convergence) n'est pas ré-analysée.
+
+    Args:
+        code: Code Python à valider
+
+    Returns:
+        Message de l'erreur de syntaxe, ou None si le code est valide
+    """
+    try:
+        compile(code, "<correction>", "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        return str(e)
+    return None
+
+
+def _index_test_files(target_dir: str) -> dict:
+    """
+    Indexe les fichiers de test du répertoire (test_*.py, *_test.py), à partir
+    de la liste des fichiers Python partagée avec les autres agents.
+
+    Returns:
+        Dictionnaire nom de fichier -> chemin complet
+    """
+    index = {}
+    try:
+        paths = list_python_files(target_dir)
+    except OSError:
+        return index
+    for path in paths:
+        name = os.path.basename(path)
+        # Seuls les tests placés directement dans target_dir sont retenus
+        if (name.startswith("test_") or name.endswith("_test.py")) and path == os.path.join(target_dir, name):
+            index[name] = path
+    return index
+
+
+def _extract_expected_names_from_issues(issues: list, target_dir: str, filename: str,
+                                        test_index: dict = None) -> str:
     """
     Extrait les noms de fonctions/variables attendus par le test (ex: add, subtract)
     à partir des erreurs "cannot import name 'X'" ou en lisant le fichier de test.
     """
     expected = set()
     module_name = filename[:-3] if filename.endswith(".py") else filename  # ex: messy_code
-    test_filename = f"test_{filename}"
-    test_path = os.path.join(target_dir, test_filename)
+    if test_index is None:
+        test_index = _index_test_files(target_dir)
+    test_path = test_index.get(f"test_{filename}") or test_index.get(f"{module_name}_test.py")
 
     # 1) Parser les erreurs "cannot import name 'xxx'"
     for issue in issues:
         desc = (issue.get("description") or "") + (issue.get("issue_type") or "")
-        for match in re.finditer(r"cannot import name ['\"]([a-zA-Z_][a-zA-Z0-9_]*)['\"]", desc):
+        for match in _CANNOT_IMPORT_RE.finditer(desc):
             expected.add(match.group(1))
-        for match in re.finditer(r"ImportError[^:]*['\"]([a-zA-Z_][a-zA-Z0-9_]*)['\"]", desc):
+        for match in _IMPORT_ERROR_RE.finditer(desc):
             expected.add(match.group(1))
 
     # 2) Lire le fichier de test pour "from module import x, y, z"
-    if os.path.exists(test_path):
+    if test_path:
         try:
             with open(test_path, "r", encoding="utf-8") as f:
                 test_content = f.read()
             # from messy_code import add, subtract
-            pattern = rf"from\s+{re.escape(module_name)}\s+import\s+(.+?)(?:\n|$)"
-            m = re.search(pattern, test_content)
-            if m:
-                imports = m.group(1).strip()
-                for part in re.split(r"\s*,\s*", imports):
-                    part = part.strip().split()[0] if part.strip() else ""
-                    if part and part.isidentifier():
-                        expected.add(part)
+            expected.update(_imported_names(test_content, module_name))
         except Exception:
             pass
 
@@ -70,130 +173,207 @@ class FixerAgent:
     """
     
     def __init__(self):
-        """Initialise l'agent avec le client Groq et le modèle Llama."""
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        """Initialise l'agent avec le modèle Llama (le client Groq est créé à la demande)."""
         self.model_name = "llama-3.3-70b-versatile"
+        # Corrections valides déjà obtenues : empreinte (modèle + prompt) -> code
+        self._fix_cache = LLMCache("fix")
 
-    def fix(self, target_dir: str, audit_response: str):
+    @cached_property
+    def client(self):
+        """Client Groq partagé, créé au premier appel au modèle."""
+        return get_groq_client()
+
+    def fix(self, target_dir: str, audit_response, max_workers: int = 1):
         """
         Corrige les problèmes détectés dans les fichiers.
+        Les fichiers sont indépendants : avec max_workers > 1, les appels
+        à Groq (limités par le réseau) sont lancés en parallèle.
         
         Args:
             target_dir: Répertoire contenant le code à corriger
-            audit_response: JSON string contenant la liste des problèmes
+            audit_response: Liste des problèmes, déjà décodée par l'appelant
+                (évite un second parsing) ou sous forme de JSON string
+            max_workers: Nombre de fichiers corrigés simultanément
+            
+        Returns:
+            True si au moins une correction a été obtenue et écrite, False sinon
+            (aucun problème, appels au modèle en échec, réponses rejetées)
         """
-        try:
-            issues = json.loads(audit_response)
-            if not issues:
-                print("  ℹ️  Aucun problème à corriger")
-                return
-        except json.JSONDecodeError as e:
-            print(f"  ❌ Impossible de parser la réponse de l'auditeur: {e}")
-            return
+        if isinstance(audit_response, list):
+            issues = audit_response
+        else:
+            try:
+                issues = fast_json.loads(audit_response)
+            except json.JSONDecodeError as e:
+                print(f"  ❌ Impossible de parser la réponse de l'auditeur: {e}")
+                return False
+        if not issues:
+            print("  ℹ️  Aucun problème à corriger")
+            return False
         
         print(f"  🛠️  {len(issues)} problème(s) identifié(s)")
         
         # Regrouper les problèmes par fichier pour une correction plus efficace
         issues_by_file = {}
         for issue in issues:
-            filename = issue.get("file", "unknown")
-            if filename not in issues_by_file:
-                issues_by_file[filename] = []
-            issues_by_file[filename].append(issue)
+            issues_by_file.setdefault(issue.get("file", "unknown"), []).append(issue)
+        
+        # Index des fichiers de test, construit une seule fois pour tous les fichiers
+        test_index = _index_test_files(target_dir)
+        
+        # Corriger chaque fichier ; les corrections valides sont écrites ensemble à la fin
+        if max_workers <= 1 or len(issues_by_file) <= 1:
+            results = [
+                self._fix_file(target_dir, filename, file_issues, test_index)
+                for filename, file_issues in issues_by_file.items()
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(self._fix_file, target_dir, filename, file_issues, test_index)
+                    for filename, file_issues in issues_by_file.items()
+                ]
+                results = [future.result() for future in as_completed(futures)]
         
-        # Corriger chaque fichier
-        for filename, file_issues in issues_by_file.items():
-            if not filename.endswith(".py"):
-                continue
+        fixes = [result for result in results if result is not None]
+        if not fixes:
+            return False
+        try:
+            safe_write_file_batch(fixes)
+        except OSError as e:
+            print(f"  ❌ Erreur lors de l'écriture des corrections: {e}")
+            return False
+        return True
+
+    def _fix_file(self, target_dir: str, filename: str, file_issues: list, test_index: dict = None):
+        """
+        Corrige un fichier à partir de ses problèmes (un appel à Groq).
+        
+        Args:
+            target_dir: Répertoire contenant le code à corriger
+            filename: Nom du fichier à corriger
+            file_issues: Problèmes détectés dans ce fichier
+            test_index: Index des fichiers de test (voir _index_test_files)
+            
+        Returns:
+            Couple (chemin, code corrigé) à écrire, ou None si aucune correction valide
+        """
+        if not filename.endswith(".py"):
+            return
+        
+        filepath = os.path.join(target_dir, filename)
+        if not os.path.isfile(filepath):
+            print(f"  ⚠️  Fichier non trouvé: {filename}")
+            return
+        
+        # Limiter à 5 problèmes par fichier et par itération pour éviter de tout casser
+        issues_to_fix = file_issues[:5]
+        print(f"\n  📝 Correction de {filename} ({len(issues_to_fix)} problèmes)...")
+        
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                original_code = f.read()
+        except Exception as e:
+            print(f"  ❌ Erreur lecture {filename}: {e}")
+            return
+        
+        # Préparer la description des problèmes pour le LLM
+        issues_description = "\n".join([
+            f"- Ligne {issue.get('line', '?')}: {issue.get('issue_type', 'Unknown')} - {issue.get('description', '')}"
+            for issue in issues_to_fix
+        ])
+
+        # Noms attendus par le test (ex: add, subtract) pour ne pas les renommer
+        expected_names_section = _extract_expected_names_from_issues(
+            issues_to_fix, target_dir, filename, test_index
+        )
+
+        # Générer le prompt de correction
+        user_prompt = _fixer_user_template().substitute(
+            issue_description=issues_description,
+            original_code=original_code,
+            expected_names_section=expected_names_section
+        )
+        system_prompt = _fixer_system_prompt()
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        # Même code et mêmes problèmes qu'une correction précédente : on la réapplique
+        cache_key = LLMCache.key(self.model_name, system_prompt, user_prompt)
+        cached = self._fix_cache.get(cache_key)
+        if cached is not None:
+            print(f"  ♻️  Correction déjà calculée réappliquée: {filename}")
+            return filepath, cached
+        
+        try:
+            # Appel à l'API Groq pour obtenir le code corrigé
+            print(f"  🤖 Génération du code corrigé avec Llama...")
+            response = self.client.chat.completions.create(
+                messages=messages,
+                model=self.model_name,
+                temperature=0.0,  # Température 0 pour des corrections déterministes
+                max_tokens=int(len(original_code) * FIX_TOKENS_PER_CHAR) + FIX_TOKENS_MARGIN
+            )
+            choice = response.choices[0]
+            fixed_code = choice.message.content
+            # Réponse coupée par max_tokens : la fin du fichier manque, même
+            # si le début compile
+            truncated = choice.finish_reason == "length"
             
-            filepath = os.path.join(target_dir, filename)
-            if not os.path.exists(filepath):
-                print(f"  ⚠️  Fichier non trouvé: {filename}")
-                continue
+            # Nettoyage de la réponse
+            fixed_code = self._clean_code_response(fixed_code)
             
-            # Limiter à 5 problèmes par fichier et par itération pour éviter de tout casser
-            issues_to_fix = file_issues[:5]
-            print(f"\n  📝 Correction de {filename} ({len(issues_to_fix)} problèmes)...")
+            # Validation de la syntaxe Python avant d'écrire
+            if truncated:
+                print(f"  ⚠️  Réponse tronquée par la limite de tokens: {filename}")
+                syntax_valid = False
+            else:
+                syntax_valid = self._validate_python_syntax(fixed_code)
             
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    original_code = f.read()
-            except Exception as e:
-                print(f"  ❌ Erreur lecture {filename}: {e}")
-                continue
+            if syntax_valid:
+                # Le fichier corrigé sera écrit par fix(), avec les autres
+                self._fix_cache.put(cache_key, fixed_code)
+                print(f"  ✅ {filename} corrigé avec succès")
+            else:
+                print(f"  ❌ Code corrigé invalide, conservation de l'original")
             
-            # Préparer la description des problèmes pour le LLM
-            issues_description = "\n".join([
-                f"- Ligne {issue.get('line', '?')}: {issue.get('issue_type', 'Unknown')} - {issue.get('description', '')}"
-                for issue in issues_to_fix
-            ])
-
-            # Noms attendus par le test (ex: add, subtract) pour ne pas les renommer
-            expected_names_section = _extract_expected_names_from_issues(
-                issues_to_fix, target_dir, filename
-            )
-
-            # Générer le prompt de correction
-            prompt = FIXER_PROMPT.substitute(
-                issue_description=issues_description,
-                original_code=original_code,
-                expected_names_section=expected_names_section
+            # Logging pour l'analyse scientifique
+            details = {
+                "file": filename,
+                "issues_count": len(issues_to_fix),
+                "input_prompt": user_prompt,  # Tronqué par le logger
+                "output_response": fixed_code,
+                "syntax_valid": syntax_valid,
+                "truncated": truncated
+            }
+            if DEBUG_EXPERIMENTS:
+                details["issues"] = issues_to_fix
+            log_experiment(
+                agent_name="FixerAgent",
+                model_used=self.model_name,
+                action=ActionType.FIX,
+                details=details,
+                status="SUCCESS" if syntax_valid else "FAILED"
             )
+            if syntax_valid:
+                return filepath, fixed_code
             
-            try:
-                # Appel à l'API Groq pour obtenir le code corrigé
-                print(f"  🤖 Génération du code corrigé avec Llama...")
-                response = self.client.chat.completions.create(
-                    messages=[{"role": "user", "content": prompt}],
-                    model=self.model_name,
-                    temperature=0.0  # Température 0 pour des corrections déterministes
-                )
-                fixed_code = response.choices[0].message.content
-                
-                # Nettoyage de la réponse
-                fixed_code = self._clean_code_response(fixed_code)
-                
-                # Validation de la syntaxe Python avant d'écrire
-                syntax_valid = self._validate_python_syntax(fixed_code)
-                
-                if syntax_valid:
-                    # Sauvegarde du fichier corrigé
-                    safe_write_file(filepath, fixed_code)
-                    print(f"  ✅ {filename} corrigé avec succès")
-                else:
-                    print(f"  ❌ Code corrigé invalide, conservation de l'original")
-                
-                # Logging pour l'analyse scientifique
-                log_experiment(
-                    agent_name="FixerAgent",
-                    model_used=self.model_name,
-                    action=ActionType.FIX,
-                    details={
-                        "file": filename,
-                        "issues_count": len(issues_to_fix),
-                        "issues": issues_to_fix,
-                        "input_prompt": prompt[:1000],  # Tronqué pour le log
-                        "output_response": fixed_code[:1000],  # Tronqué pour le log
-                        "syntax_valid": syntax_valid
-                    },
-                    status="SUCCESS" if syntax_valid else "FAILED"
-                )
-                
-            except Exception as e:
-                print(f"  ❌ Erreur lors de la correction de {filename}: {e}")
-                log_experiment(
-                    agent_name="FixerAgent",
-                    model_used=self.model_name,
-                    action=ActionType.FIX,
-                    details={
-                        "file": filename,
-                        "issues_count": len(issues_to_fix),
-                        "input_prompt": prompt[:1000],
-                        "output_response": f"ERROR: {str(e)}",
-                        "syntax_valid": False
-                    },
-                    status="FAILED"
-                )
+        except Exception as e:
+            print(f"  ❌ Erreur lors de la correction de {filename}: {e}")
+            log_experiment(
+                agent_name="FixerAgent",
+                model_used=self.model_name,
+                action=ActionType.FIX,
+                details={
+                    "file": filename,
+                    "issues_count": len(issues_to_fix),
+                    "input_prompt": user_prompt,
+                    "output_response": f"ERROR: {str(e)}",
+                    "syntax_valid": False
+                },
+                status="FAILED"
+            )
 
     def _clean_code_response(self, response: str) -> str:
         """
@@ -206,21 +386,12 @@ class FixerAgent:
         Returns:
             Code Python nettoyé
         """
-        cleaned = response.strip()
-        
         # Suppression des blocs de code markdown
-        if "```python" in cleaned:
-            cleaned = cleaned.split("```python")[1].split("```")[0]
-        elif "```" in cleaned:
-            parts = cleaned.split("```")
-            if len(parts) >= 2:
-                cleaned = parts[1]
-        
-        return cleaned.strip()
+        return strip_code_fences(response, "python")
 
     def _validate_python_syntax(self, code: str) -> bool:
         """
-        Valide la syntaxe Python du code avec ast.parse().
+        Valide la syntaxe Python du code (compilation sans exécution).
         Cela nous garantit que nous n'écrivons jamais du code syntaxiquement incorrect.
         
         Args:
@@ -229,9 +400,8 @@ class FixerAgent:
         Returns:
             True si la syntaxe est valide, False sinon
         """
-        try:
-            ast.parse(code)
-            return True
-        except SyntaxError as e:
-            print(f"  ⚠️  Erreur de syntaxe détectée: {e}")
-            return False
\ No newline at end of file
+        error = _syntax_error(code)
+        if error is not None:
+            print(f"  ⚠️  Erreur de syntaxe détectée: {error}")
+            return False
+        return True
\ No newline at end of file
@@ -2,15 +2,145 @@
 Agent Testeur - Valide le code en générant et exécutant des tests.
 Utilise Groq (Llama) pour générer des tests intelligents et adaptatifs.
 """
+import ast
+import hashlib
 import os
+import re
 import subprocess
 import sys
-from groq import Groq
-from dotenv import load_dotenv
+import time
+from functools import cached_property
 from src.utils.logger import log_experiment, ActionType
-from src.tools.file_handler import safe_write_file
+from src.tools.file_handler import safe_write_file, list_python_files, RACY_MTIME_WINDOW_NS
+from src.utils.groq_client import get_groq_client, load_env
+from src.utils.llm_cache import LLMCache
+from src.utils.llm_parse import strip_code_fences
 
-load_dotenv()
+load_env()
+
+# Options pytest : pas de plugin de cache (rien n'est écrit dans le dossier
+# cible, un plugin de moins à charger) ni d'en-tête de session. La sortie
+# -v reste complète : le swarm lit la ligne de résumé finale
+PYTEST_ARGS = ("-v", "--tb=short", "-p", "no:cacheprovider", "--no-header")
+
+# Variables d'environnement du processus pytest : pas de fichiers .pyc dans
+# le dossier cible
+PYTEST_ENV_OVERRIDES = {
+    "PYTHONDONTWRITEBYTECODE": "1",
+}
+
+# Pour les tests générés par l'agent seulement : aucun plugin tiers chargé
+# au démarrage (ils n'utilisent que des assert, pytest démarre nettement plus
+# vite). Les tests existants de l'utilisateur gardent leurs plugins
+# (pytest-mock, pytest-asyncio...)
+GENERATED_TEST_ENV_OVERRIDES = {
+    **PYTEST_ENV_OVERRIDES,
+    "PYTEST_DISABLE_PLUGIN_AUTOLOAD": "1",
+}
+
+# Résultats pytest mémorisés (les plus anciens sont évincés)
+PYTEST_RESULTS_MAX_ENTRIES = 4
+
+# Première ligne pertinente d'un échec pytest (une seule recherche dans la sortie)
+_ERROR_LINE_RE = re.compile(r"^.*(?:FAILED|ERROR|(?i:assert)).*$", re.MULTILINE)
+
+# Plafond de la réponse du générateur de tests, proportionnel au module
+# testé : un test fait souvent deux à trois fois la taille du code
+# (~0.3 token par caractère), avec un minimum et un maximum
+TEST_TOKENS_PER_CHAR = 1.0
+TEST_TOKENS_MIN = 800
+TEST_TOKENS_MAX = 8192
+
+# Instructions de génération de test, identiques à chaque appel : elles forment
+# le message système, le module et son code le message utilisateur. Le préfixe
+# commun peut ainsi être mis en cache côté fournisseur
+TEST_GENERATION_SYSTEM_PROMPT = """Tu es un expert en tests Python. Génère un fichier de test pytest pour le module fourni par l'utilisateur.
+Dans ces instructions, <module> désigne le nom de ce module (ligne MODULE du message utilisateur).
+
+INSTRUCTIONS CRITIQUES:
+
+1. ANALYSE D'ABORD LE CODE:
+   - Identifie TOUTES les fonctions définies dans le code source
+   - Comprends ce que fait chaque fonction (addition, soustraction, calcul, etc.)
+   - Note les paramètres de chaque fonction
+
+2. GÉNÈRE DES TESTS SIMPLES ET ROBUSTES:
+   - Importe les fonctions avec: from <module> import *
+   - Crée UNE fonction de test par fonction trouvée dans le code
+   - Utilise UNIQUEMENT des nombres ENTIERS dans les tests (jamais de floats)
+   - NE teste PAS les exceptions (pas de pytest.raises)
+   - Teste que chaque fonction retourne le bon résultat
+
+3. RÈGLES POUR LES TESTS:
+   - Pour une fonction d'addition: teste avec 2+3=5, 10+5=15, etc.
+   - Pour une fonction de soustraction: teste avec 5-3=2, 10-4=6, etc.
+   - Pour une fonction de multiplication: teste avec 3*4=12, 5*2=10, etc.
+   - Pour une fonction de division: teste SEULEMENT avec des diviseurs NON-NULS (10/2=5, 20/4=5)
+   - Pour division par zéro: teste juste que la fonction retourne quelque chose (pas None)
+
+4. FORMAT DE SORTIE:
+   - Commence directement par: from <module> import *
+   - Pas de texte explicatif
+   - Pas de blocs markdown (```python ou ```)
+   - Juste du code Python pur et simple
+
+EXEMPLE (si le code contient "def calculate(a, b): return a + b"):
+from <module> import calculate
+
+def test_calculate():
+    assert calculate(5, 3) == 8
+    assert calculate(10, 2) == 12
+    assert calculate(0, 0) == 0
+
+Retourne UNIQUEMENT le code Python du test, rien d'autre.
+"""
+
+def _source_signature(source_code: str):
+    """
+    Empreinte de l'interface publique d'un module : noms des fonctions avec
+    leur nombre de paramètres, et noms des classes, au premier niveau.
+    Deux versions qui ne diffèrent que par le corps des fonctions (commentaires,
+    mise en forme, correction interne) ont la même empreinte.
+    
+    Args:
+        source_code: Code source du module
+        
+    Returns:
+        Tuple trié décrivant l'interface, ou None si le code ne se parse pas
+    """
+    try:
+        tree = ast.parse(source_code)
+    except (SyntaxError, ValueError):
+        return None
+    signature = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            signature.append((node.name, len(node.args.args)))
+        elif isinstance(node, ast.ClassDef):
+            signature.append((node.name, -1))
+    return tuple(sorted(signature))
+
+def _compile_error(path: str):
+    """
+    Compile un fichier sans l'exécuter, pour détecter une erreur de syntaxe
+    sans lancer de processus pytest.
+    
+    Args:
+        path: Chemin du fichier Python
+        
+    Returns:
+        Message d'erreur au format d'un traceback, ou None si le fichier compile
+        (ou ne peut pas être lu : pytest signalera alors le problème)
+    """
+    try:
+        with open(path, "rb") as f:
+            compile(f.read(), path, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        line = getattr(e, "lineno", None)
+        return f'  File "{path}", line {line}\n{type(e).__name__}: {getattr(e, "msg", e)}'
+    except OSError:
+        pass
+    return None
 
 class JudgeAgent:
     """
@@ -19,9 +149,23 @@ class JudgeAgent:
     """
     
     def __init__(self):
-        """Initialise l'agent avec le client Groq et le modèle Llama."""
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        """Initialise l'agent avec le modèle Llama (le client Groq est créé à la demande)."""
         self.model_name = "llama-3.3-70b-versatile"
+        # Tests générés entre exécutions : empreinte (modèle + prompt) -> test
+        self._test_cache = LLMCache("tests")
+        # Fichiers de test déjà localisés (fichier source -> chemin du test)
+        self._test_files = {}
+        # Fichier principal retenu par répertoire cible
+        self._main_files = {}
+        # Résultats pytest récents par empreinte (stat) des fichiers du dossier
+        self._pytest_results = {}
+        # Tests écrits par l'agent (les autres appartiennent à l'utilisateur)
+        self._generated_tests = set()
+
+    @cached_property
+    def client(self):
+        """Client Groq partagé, créé au premier appel au modèle."""
+        return get_groq_client()
 
     def validate(self, target_dir: str) -> bool:
         """
@@ -46,43 +190,92 @@ class JudgeAgent:
         Returns:
             Tuple (succès: bool, message d'erreur: str)
         """
-        # Recherche des fichiers Python (non-test)
-        py_files = []
-        for root, _, files in os.walk(target_dir):
-            for file in files:
-                if file.endswith(".py") and not file.startswith("test_"):
-                    py_files.append(os.path.join(root, file))
+        # Le couple (fichier principal, test) ne change pas d'une itération
+        # à l'autre : une fois connu, le parcours du répertoire est évité,
+        # tant que les deux fichiers existent toujours (l'agent est partagé
+        # par tout le processus)
+        main_file = self._main_files.get(target_dir)
+        test_path = self._test_files.get(main_file)
+        if test_path is not None and not (os.path.isfile(main_file) and os.path.isfile(test_path)):
+            del self._main_files[target_dir]
+            test_path = None
         
-        if not py_files:
-            print("  ℹ️  Aucun fichier Python à tester")
-            return True, ""
+        if test_path is None:
+            py_files, all_py_files = self._scan_python_files(target_dir)
+            
+            if not py_files:
+                print("  ℹ️  Aucun fichier Python à tester")
+                return True, ""
+            
+            # Utilisation du premier fichier Python trouvé
+            main_file = py_files[0]
+            self._main_files[target_dir] = main_file
+            test_path = self._find_test_file(target_dir, main_file, all_py_files)
         
-        # Utilisation du premier fichier Python trouvé
-        main_file = py_files[0]
         filename = os.path.basename(main_file)
         test_filename = f"test_{filename}"
-        test_path = os.path.join(target_dir, test_filename)
         
         # Génération du test si nécessaire
-        if not os.path.exists(test_path):
+        if test_path is None:
             print(f"  🔧 Génération du test pour {filename}...")
             self._generate_test(target_dir, filename, test_filename, main_file)
+            test_path = os.path.join(target_dir, test_filename)
+            self._test_files[main_file] = test_path
+            self._generated_tests.add(test_path)
         else:
             print(f"  📋 Test existant trouvé: {test_filename}")
         
-        # Exécution des tests avec pytest
-        try:
-            print(f"  🧪 Exécution de pytest sur {test_filename}...")
-            result = subprocess.run(
-                [sys.executable, "-m", "pytest", test_path, "-v", "--tb=short"],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=target_dir
+        # Un fichier qui ne compile pas fait échouer pytest à coup sûr :
+        # l'erreur est rapportée directement, sans lancer de sous-processus
+        syntax_error = _compile_error(main_file) or _compile_error(test_path)
+        if syntax_error:
+            print(f"  ❌ Erreur de syntaxe, pytest non lancé: {test_filename}")
+            print(f"  💥 Erreur: {syntax_error.splitlines()[-1][:100]}")
+            output = f"ERROR collecting {test_filename}\n{syntax_error}"
+            log_experiment(
+                agent_name="JudgeAgent",
+                model_used="compile",
+                action=ActionType.DEBUG,
+                details={
+                    "target_dir": target_dir,
+                    "test_file": test_filename,
+                    "input_prompt": f"Compile {filename} and {test_filename}",
+                    "output_response": output
+                },
+                status="FAILED"
             )
-            
-            success = (result.returncode == 0)
-            output = result.stdout + "\n" + result.stderr
+            return False, output
+        
+        # Exécution des tests avec pytest, sauf si ni le code ni les tests
+        # n'ont changé depuis une exécution précédente
+        content_key = self._content_fingerprint(target_dir, test_path)
+        try:
+            cached = self._pytest_results.get(content_key)
+            if cached is not None:
+                print(f"  ♻️  Code et tests inchangés, résultat pytest réutilisé: {test_filename}")
+                success, output = cached
+            else:
+                print(f"  🧪 Exécution de pytest sur {test_filename}...")
+                if test_path in self._generated_tests:
+                    env_overrides = GENERATED_TEST_ENV_OVERRIDES
+                else:
+                    env_overrides = PYTEST_ENV_OVERRIDES
+                result = subprocess.run(
+                    [sys.executable, "-m", "pytest", test_path, *PYTEST_ARGS],
+                    capture_output=True,
+                    text=True,
+                    timeout=30,
+                    cwd=target_dir,
+                    env={**os.environ, **env_overrides}
+                )
+                
+                success = (result.returncode == 0)
+                output = result.stdout + "\n" + result.stderr
+                if content_key is not None:
+                    self._pytest_results[content_key] = (success, output)
+                    # Seules les dernières exécutions peuvent encore resservir
+                    while len(self._pytest_results) > PYTEST_RESULTS_MAX_ENTRIES:
+                        del self._pytest_results[next(iter(self._pytest_results))]
             
             # Logging pour l'analyse scientifique
             log_experiment(
@@ -93,7 +286,7 @@ class JudgeAgent:
                     "target_dir": target_dir,
                     "test_file": test_filename,
                     "input_prompt": f"Execute pytest on {test_filename}",
-                    "output_response": output[:2000]  # Tronqué pour le log
+                    "output_response": output  # Tronqué par le logger
                 },
                 status="SUCCESS" if success else "FAILED"
             )
@@ -101,11 +294,13 @@ class JudgeAgent:
             if success:
                 print(f"  ✅ Tests passés: {test_filename}")
             else:
-                print(f"  ❌ Tests échoués: {test_filename}")
-                # Afficher un extrait de l'erreur
-                error_lines = [line for line in output.split('\n') if 'FAILED' in line or 'ERROR' in line or 'assert' in line.lower()]
-                if error_lines:
-                    print(f"  💥 Erreur: {error_lines[0][:100]}")
+                # Échec et extrait de l'erreur affichés en un seul appel à print
+                report = [f"  ❌ Tests échoués: {test_filename}"]
+                # Seule la première ligne pertinente est utile : arrêt dès qu'elle est trouvée
+                first_error = _ERROR_LINE_RE.search(output)
+                if first_error:
+                    report.append(f"  💥 Erreur: {first_error.group(0)[:100]}")
+                print("\n".join(report))
             
             return success, output
             
@@ -118,6 +313,95 @@ class JudgeAgent:
             print(f"  ❌ {error_msg}")
             return False, error_msg
 
+    def _content_fingerprint(self, target_dir: str, test_path: str):
+        """
+        Empreinte (blake2b) de tous les fichiers du dossier, à partir de leurs
+        métadonnées (chemin, date de modification, taille) : le test peut
+        importer n'importe quel module ou lire des données (ex: test.json),
+        mais aucun contenu n'est lu. Les caches (__pycache__, dossiers cachés)
+        sont ignorés.
+        
+        Args:
+            target_dir: Répertoire cible
+            test_path: Chemin du fichier de test exécuté
+            
+        Returns:
+            Empreinte hexadécimale, ou None si un fichier ne peut pas être
+            examiné ou vient d'être modifié (date trop récente pour être fiable,
+            voir RACY_MTIME_WINDOW_NS) : le résultat n'est alors pas mémorisé
+        """
+        racy_after = time.time_ns() - RACY_MTIME_WINDOW_NS
+        digest = hashlib.blake2b(test_path.encode("utf-8"), digest_size=16)
+        try:
+            for directory, dirnames, filenames in os.walk(target_dir):
+                # Parcours dans un ordre stable, sans descendre dans les caches
+                dirnames[:] = sorted(
+                    name for name in dirnames
+                    if name != "__pycache__" and not name.startswith(".")
+                )
+                for name in sorted(filenames):
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    if stat.st_mtime_ns >= racy_after:
+                        return None
+                    digest.update(f"\0{path}\0{stat.st_mtime_ns}\0{stat.st_size}".encode("utf-8"))
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def _scan_python_files(self, target_dir: str) -> tuple[list, set]:
+        """
+        Recherche des fichiers Python (liste partagée avec les autres agents,
+        mémorisée tant que le répertoire ne change pas).
+        
+        Args:
+            target_dir: Répertoire cible
+            
+        Returns:
+            Tuple (fichiers source hors tests, ensemble de tous les .py) ;
+            l'ensemble sert à tester l'existence du test sans stat supplémentaire
+        """
+        py_files = []
+        all_py_files = set()
+        try:
+            for path in list_python_files(target_dir):
+                all_py_files.add(path)
+                if not os.path.basename(path).startswith("test_"):
+                    py_files.append(path)
+        except OSError:
+            # Répertoire cible illisible ou absent : aucun fichier à tester
+            pass
+        return py_files, all_py_files
+
+    def _find_test_file(self, target_dir: str, main_file: str, known_files: set):
+        """
+        Localise le fichier de test associé à main_file.
+        L'existence est vérifiée dans known_files (aucun stat) et le
+        résultat positif est mémorisé pour les itérations suivantes ; un
+        test mémorisé qui a disparu depuis (supprimé, renommé) est oublié.
+        
+        Args:
+            target_dir: Répertoire cible
+            main_file: Chemin complet du fichier à tester
+            known_files: Chemins des fichiers .py trouvés dans target_dir
+            
+        Returns:
+            Chemin du fichier de test, ou None s'il n'existe pas encore
+        """
+        test_path = self._test_files.get(main_file)
+        if test_path is not None:
+            if test_path in known_files:
+                return test_path
+            del self._test_files[main_file]
+        
+        test_path = os.path.join(target_dir, f"test_{os.path.basename(main_file)}")
+        if test_path not in known_files:
+            # Pas de mémorisation du négatif : le test va être généré
+            return None
+        
+        self._test_files[main_file] = test_path
+        return test_path
+
     def _generate_test(self, target_dir: str, py_file: str, test_file: str, main_file_path: str):
         """
         Génère un test intelligent pour le fichier Python en utilisant Groq (Llama).
@@ -138,8 +422,11 @@ class JudgeAgent:
         
         module_name = py_file[:-3]  # Retirer .py
         
-        # Génération de test avec Groq si le code source est disponible
-        if source_code and len(source_code.strip()) > 0:
+        # Génération de test avec Groq si le code source contient de quoi tester :
+        # un module sans fonction ni classe (imports, constantes) n'a besoin
+        # que du test d'import, sans appel au modèle
+        use_model = bool(source_code.strip()) and _source_signature(source_code) != ()
+        if use_model:
             test_code = self._generate_smart_test(module_name, source_code)
         else:
             # Fallback: test minimal
@@ -152,13 +439,13 @@ class JudgeAgent:
         # Logging
         log_experiment(
             agent_name="JudgeAgent",
-            model_used=self.model_name if source_code else "rule-based",
+            model_used=self.model_name if use_model else "rule-based",
             action=ActionType.GENERATION,
             details={
                 "file_generated": test_file,
                 "module_tested": module_name,
                 "input_prompt": f"Generate comprehensive tests for {py_file}",
-                "output_response": test_code[:1000]  # Tronqué pour le log
+                "output_response": test_code  # Tronqué par le logger
             }
         )
         
@@ -176,71 +463,47 @@ class JudgeAgent:
         Returns:
             Code du test généré
         """
-        prompt = f"""Tu es un expert en tests Python. Génère un fichier de test pytest pour ce module.
-
-MODULE: {module_name}
+        user_prompt = f"""MODULE: {module_name}
 
 CODE SOURCE À TESTER:
 ```python
 {source_code}
 ```
 
-INSTRUCTIONS CRITIQUES:
-
-1. ANALYSE D'ABORD LE CODE:
-   - Identifie TOUTES les fonctions définies dans le code source
-   - Comprends ce que fait chaque fonction (addition, soustraction, calcul, etc.)
-   - Note les paramètres de chaque fonction
-
-2. GÉNÈRE DES TESTS SIMPLES ET ROBUSTES:
-   - Importe les fonctions avec: from {module_name} import *
-   - Crée UNE fonction de test par fonction trouvée dans le code
-   - Utilise UNIQUEMENT des nombres ENTIERS dans les tests (jamais de floats)
-   - NE teste PAS les exceptions (pas de pytest.raises)
-   - Teste que chaque fonction retourne le bon résultat
-
-3. RÈGLES POUR LES TESTS:
-   - Pour une fonction d'addition: teste avec 2+3=5, 10+5=15, etc.
-   - Pour une fonction de soustraction: teste avec 5-3=2, 10-4=6, etc.
-   - Pour une fonction de multiplication: teste avec 3*4=12, 5*2=10, etc.
-   - Pour une fonction de division: teste SEULEMENT avec des diviseurs NON-NULS (10/2=5, 20/4=5)
-   - Pour division par zéro: teste juste que la fonction retourne quelque chose (pas None)
-
-4. FORMAT DE SORTIE:
-   - Commence directement par: from {module_name} import *
-   - Pas de texte explicatif
-   - Pas de blocs markdown (```python ou ```)
-   - Juste du code Python pur et simple
-
-EXEMPLE (si le code contient "def calculate(a, b): return a + b"):
-from {module_name} import calculate
-
-def test_calculate():
-    assert calculate(5, 3) == 8
-    assert calculate(10, 2) == 12
-    assert calculate(0, 0) == 0
-
-MAINTENANT, génère le test pour le code fourni ci-dessus.
-Retourne UNIQUEMENT le code Python du test, rien d'autre.
+MAINTENANT, génère le test pour ce code (en commençant par: from {module_name} import *).
 """
+        messages = [
+            {"role": "system", "content": TEST_GENERATION_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ]
+        # La clé porte sur le prompt complet, code source compris : un test
+        # généré pour un autre corps de fonction (ou un autre projet ayant la
+        # même interface) n'est jamais réutilisé
+        cache_key = LLMCache.key(self.model_name, TEST_GENERATION_SYSTEM_PROMPT, user_prompt)
+        cached = self._test_cache.get(cache_key)
+        if cached is not None:
+            print("  ♻️  Test déjà généré pour ce code, réutilisation")
+            return cached
         
         try:
             response = self.client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
+                messages=messages,
                 model=self.model_name,
-                temperature=0.1  # Très bas pour des tests déterministes
+                temperature=0.1,  # Très bas pour des tests déterministes
+                max_tokens=min(
+                    TEST_TOKENS_MAX,
+                    TEST_TOKENS_MIN + int(len(source_code) * TEST_TOKENS_PER_CHAR)
+                )
             )
-            test_code = response.choices[0].message.content.strip()
+            choice = response.choices[0]
+            # Test coupé par max_tokens : une fois écrit, il ne serait jamais
+            # régénéré et échouerait à chaque itération
+            if choice.finish_reason == "length":
+                print("  ⚠️  Test généré tronqué, utilisation du fallback minimal")
+                return self._generate_minimal_test(module_name)
             
             # Nettoyage agressif des blocs markdown
-            if "```python" in test_code:
-                test_code = test_code.split("```python")[1].split("```")[0]
-            elif "```" in test_code:
-                parts = test_code.split("```")
-                if len(parts) >= 2:
-                    test_code = parts[1]
-            
-            test_code = test_code.strip()
+            test_code = strip_code_fences(choice.message.content, "python")
             
             # Vérifier que le test généré n'est pas vide
             if len(test_code) < 50:
@@ -248,6 +511,9 @@ Retourne UNIQUEMENT le code Python du test, rien d'autre.
                 return self._generate_minimal_test(module_name)
             
             print(f"  📝 Test généré: {len(test_code)} caractères")
+            # Seul un test syntaxiquement valide est réutilisable
+            if _source_signature(test_code) is not None:
+                self._test_cache.put(cache_key, test_code)
             return test_code
             
         except Exception as e:
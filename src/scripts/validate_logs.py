@@ -3,69 +3,197 @@ Script de validation des logs d'expérimentation.
 Vérifie que le fichier experiment_data.json respecte le protocole de logging requis.
 """
 import json
-from pathlib import Path
+import os
+from collections import Counter
+
+# Chemin du fichier de logs à valider
+LOG_FILE = os.path.join("logs", "experiment_data.json")
+
+# Champs obligatoires de toute entrée de log (ensembles immuables, construits une seule fois)
+REQUIRED_FIELDS = frozenset({"timestamp", "agent", "model", "action", "status", "details"})
 
 # Actions qui nécessitent les champs input_prompt et output_response
-REQUIRED_DETAIL_KEYS = {"input_prompt", "output_response"}
-PROMPT_ACTIONS = {"CODE_ANALYSIS", "FIX", "DEBUG"}
+REQUIRED_DETAIL_KEYS = frozenset({"input_prompt", "output_response"})
+PROMPT_ACTIONS = frozenset({"CODE_ANALYSIS", "FIX", "DEBUG"})
+
+# Taille des blocs lus : le fichier est validé au fil de la lecture,
+# la mémoire utilisée ne dépend pas de la taille du journal
+READ_CHUNK_SIZE = 1 << 16
+
+# Au-delà, la validation s'arrête : les premières erreurs suffisent au diagnostic
+MAX_REPORTED_ERRORS = 100
+
+_WHITESPACE = " \t\n\r"
+
+# Une erreur de décodage à moins de ce nombre de caractères de la fin du
+# tampon peut venir d'une entrée coupée (ex: "tru" pour "true") : le bloc
+# suivant est lu avant de conclure
+_TRUNCATION_SLACK = 8
+
+def _is_truncated(error: json.JSONDecodeError, buffer: str) -> bool:
+    """
+    Indique si une erreur de décodage peut venir de la fin du tampon plutôt
+    que d'une entrée mal formée (auquel cas lire la suite ne changerait rien).
+    Une chaîne non terminée ne peut s'étendre qu'à la fin du tampon : un
+    retour à la ligne dans une chaîne est une autre erreur.
+    
+    Args:
+        error: Erreur levée par raw_decode
+        buffer: Tampon décodé
+        
+    Returns:
+        True si lire la suite du fichier peut résoudre l'erreur
+    """
+    return (error.msg.startswith("Unterminated string")
+            or len(buffer) - error.pos <= _TRUNCATION_SLACK)
+
+def _iter_entries(f):
+    """
+    Parcourt un tableau JSON entrée par entrée, sans le charger en entier.
+    
+    Args:
+        f: Fichier texte ouvert en lecture
+        
+    Yields:
+        Entrées du tableau, dans l'ordre
+        
+    Raises:
+        ValueError: Si le document n'est pas un tableau JSON
+        json.JSONDecodeError: Si le document est mal formé
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_CHUNK_SIZE).lstrip(_WHITESPACE)
+    if not buffer.startswith("["):
+        raise ValueError("Le fichier de logs doit être un tableau JSON")
+    pos = 1
+    expect_value = True
+    first = True
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            more = f.read(READ_CHUNK_SIZE)
+            if not more:
+                raise json.JSONDecodeError("Fin de fichier inattendue", buffer, pos)
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        
+        char = buffer[pos]
+        if char == "]" and (first or not expect_value):
+            # Seuls des blancs peuvent suivre le tableau
+            rest = buffer[pos + 1:]
+            while not rest.strip(_WHITESPACE):
+                rest = f.read(READ_CHUNK_SIZE)
+                if not rest:
+                    return
+            raise json.JSONDecodeError("Contenu inattendu après le tableau", buffer, pos + 1)
+        if not expect_value:
+            if char != ",":
+                raise json.JSONDecodeError("Virgule attendue entre deux entrées", buffer, pos)
+            pos += 1
+            expect_value = True
+            continue
+        
+        try:
+            entry, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if not _is_truncated(e, buffer):
+                raise
+            # Entrée coupée par la fin du bloc : lecture de la suite, au moins
+            # aussi longue que la partie déjà lue (une entrée très longue n'est
+            # redécodée qu'un nombre logarithmique de fois)
+            more = f.read(max(READ_CHUNK_SIZE, len(buffer) - pos))
+            if not more:
+                raise
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        
+        yield entry
+        first = False
+        expect_value = False
+        pos = end
+        # Les entrées déjà validées sont retirées du tampon
+        if pos > READ_CHUNK_SIZE:
+            buffer, pos = buffer[pos:], 0
+
+def _entry_error(i: int, entry):
+    """
+    Vérifie une entrée de log.
+    
+    Args:
+        i: Position de l'entrée dans le tableau
+        entry: Entrée décodée
+        
+    Returns:
+        Message d'erreur, ou None si l'entrée est conforme
+    """
+    if not isinstance(entry, dict):
+        return f"Entrée [{i}]: doit être un objet JSON"
+    
+    # Vérification des champs obligatoires
+    missing = REQUIRED_FIELDS - entry.keys()
+    if missing:
+        return f"Entrée [{i}]: champs manquants: {missing}"
+    
+    # Le statut sert de clé dans la répartition par statut
+    if not isinstance(entry["status"], str):
+        return f"Entrée [{i}]: 'status' doit être une chaîne"
+    
+    action = entry.get("action")
+    details = entry.get("details")
+    
+    # Validation spécifique pour les actions de prompt
+    if action in PROMPT_ACTIONS:
+        if not isinstance(details, dict):
+            return f"Entrée [{i}]: 'details' doit être un objet pour l'action {action}"
+        
+        missing_details = REQUIRED_DETAIL_KEYS - details.keys()
+        if missing_details:
+            return f"Entrée [{i}]: l'action {action} nécessite les champs: {missing_details}"
+    return None
 
 def main():
     """Valide le contenu du fichier de logs."""
-    log_path = Path("logs/experiment_data.json")
-    
-    if not log_path.exists():
+    if not os.path.exists(LOG_FILE):
         print("✅ OK: Aucun fichier de logs généré (projet pas encore exécuté)")
         return
     
+    print("📊 Validation des entrées de log...")
+    
+    errors = []
+    # Répartition par statut, agrégée au fil de la lecture
+    statuses = Counter()
+    count = 0
     try:
-        data = json.loads(log_path.read_text(encoding="utf-8"))
+        with open(LOG_FILE, "r", encoding="utf-8") as f:
+            for i, entry in enumerate(_iter_entries(f)):
+                count += 1
+                error = _entry_error(i, entry)
+                if error:
+                    errors.append(error)
+                    if len(errors) >= MAX_REPORTED_ERRORS:
+                        break
+                else:
+                    statuses[entry["status"]] += 1
     except json.JSONDecodeError as e:
         print(f"❌ ERREUR: Fichier de logs invalide (JSON mal formé)")
         print(f"   Détail: {e}")
         return
-    
-    if not isinstance(data, list):
-        print("❌ ERREUR: Le fichier de logs doit être un tableau JSON")
+    except ValueError as e:
+        print(f"❌ ERREUR: {e}")
         return
     
-    print(f"📊 Validation de {len(data)} entrée(s) de log...")
-    
-    errors = []
-    for i, entry in enumerate(data):
-        if not isinstance(entry, dict):
-            errors.append(f"Entrée [{i}]: doit être un objet JSON")
-            continue
-        
-        # Vérification des champs obligatoires
-        required_fields = {"timestamp", "agent", "model", "action", "status", "details"}
-        missing = required_fields - entry.keys()
-        if missing:
-            errors.append(f"Entrée [{i}]: champs manquants: {missing}")
-            continue
-        
-        action = entry.get("action")
-        details = entry.get("details")
-        
-        # Validation spécifique pour les actions de prompt
-        if action in PROMPT_ACTIONS:
-            if not isinstance(details, dict):
-                errors.append(f"Entrée [{i}]: 'details' doit être un objet pour l'action {action}")
-                continue
-            
-            missing_details = REQUIRED_DETAIL_KEYS - details.keys()
-            if missing_details:
-                errors.append(
-                    f"Entrée [{i}]: l'action {action} nécessite les champs: {missing_details}"
-                )
-    
     if errors:
         print(f"\n❌ {len(errors)} erreur(s) trouvée(s):")
         for error in errors:
             print(f"   • {error}")
+        if len(errors) >= MAX_REPORTED_ERRORS:
+            print(f"   (validation interrompue après {MAX_REPORTED_ERRORS} erreurs)")
         return
     
+    breakdown = ", ".join(f"{status}: {n}" for status, n in statuses.most_common())
     print(f"✅ OK: Tous les logs sont conformes au protocole")
-    print(f"   {len(data)} entrée(s) validée(s)")
+    print(f"   {count} entrée(s) validée(s)" + (f" ({breakdown})" if breakdown else ""))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
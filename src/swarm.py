@@ -2,11 +2,128 @@
 RefactoringSwarm - Orchestrateur du système multi-agents.
 Gère le cycle d'analyse, correction et validation du code.
 """
+import hashlib
 import os
 import json
-from src.agents.auditor import AuditorAgent
-from src.agents.fixer import FixerAgent
-from src.agents.judge import JudgeAgent
+import re
+from functools import cached_property
+from src.agents import get_agent
+from src.utils.logger import flush_logs
+from src.utils import fast_json
+
+# Lignes de séparation de l'affichage console
+_SEPARATOR = "=" * 70
+_RULE = "-" * 70
+
+# Ligne de résumé finale de pytest, ex: "==== 1 failed, 2 passed in 0.12s ===="
+_PYTEST_SUMMARY_RE = re.compile(r"^=+ (.+?) in [\d.]+s", re.MULTILINE)
+_FAILURE_COUNT_RE = re.compile(r"(\d+) (?:failed|errors?)\b")
+_PASSED_COUNT_RE = re.compile(r"(\d+) passed\b")
+
+# Première ligne d'erreur à afficher (une seule recherche, sans découper la sortie)
+_ERROR_LINE_RE = re.compile(r"^.*(?:FAILED|ERROR|SyntaxError).*$", re.MULTILINE)
+
+# Erreur de syntaxe rapportée par le juge (compilation) ou par pytest (collecte) :
+# emplacement(s) "File ..., line N" et message, préfixés par "E" chez pytest
+_SYNTAX_LOCATION_RE = re.compile(r'^[E \t]*File "([^"]*)", line (\d+)', re.MULTILINE)
+_SYNTAX_MESSAGE_RE = re.compile(r"^[E \t]*((?:Syntax|Indentation|Tab)Error: .*)$", re.MULTILINE)
+
+# Durées affichées par pytest ("in 0.12s", "(0.01s)"), ignorées pour comparer deux sorties
+_DURATION_RE = re.compile(r"\d+(?:\.\d+)?s\b")
+
+
+def _test_score(test_output: str):
+    """
+    Calcule un score de progression d'après le résumé pytest : moins
+    d'échecs (failed + errors) d'abord, puis plus de tests passés.
+    Un score plus petit est meilleur.
+    
+    Args:
+        test_output: Sortie complète de pytest
+        
+    Returns:
+        Tuple (échecs, -tests passés), ou None si aucun résumé n'a été trouvé (ex: timeout)
+    """
+    # Le résumé est en fin de sortie : les lignes sont examinées en partant
+    # de la fin, sans parcourir toute la sortie (souvent longue en cas d'échec)
+    end = len(test_output)
+    while True:
+        start = test_output.rfind("\n", 0, end) + 1
+        match = _PYTEST_SUMMARY_RE.match(test_output, start, end)
+        if match:
+            break
+        if start == 0:
+            return None
+        end = start - 1
+    summary = match.group(1)
+    failures = sum(int(n) for n in _FAILURE_COUNT_RE.findall(summary))
+    passed = sum(int(n) for n in _PASSED_COUNT_RE.findall(summary))
+    return failures, -passed
+
+
+def _syntax_error_signature(test_output: str):
+    """
+    Identifie l'erreur de syntaxe d'une sortie de tests (message et emplacement).
+    Une erreur de compilation n'a pas de résumé pytest (ou compte pour
+    "1 error") : c'est sa nature et sa position qui montrent un progrès.
+    
+    Args:
+        test_output: Sortie du juge (pytest ou compilation)
+        
+    Returns:
+        Tuple (message, emplacements), ou None sans erreur de syntaxe
+    """
+    message = _SYNTAX_MESSAGE_RE.search(test_output)
+    if message is None:
+        return None
+    return message.group(1).strip(), tuple(_SYNTAX_LOCATION_RE.findall(test_output))
+
+
+def _error_fingerprint(test_output: str) -> str:
+    """
+    Empreinte d'une sortie de tests, indépendante des durées d'exécution.
+    
+    Args:
+        test_output: Sortie complète de pytest
+        
+    Returns:
+        Empreinte hexadécimale (blake2b)
+    """
+    normalized = _DURATION_RE.sub("", test_output)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CallBudget:
+    """
+    Budget global d'appels aux agents pour une exécution du swarm.
+    Borne le coût total (appels Groq + pytest) indépendamment du nombre
+    de fichiers et d'itérations.
+    """
+    
+    def __init__(self, limit=None):
+        """
+        Args:
+            limit: Nombre maximal d'appels (None = illimité)
+        """
+        self.remaining = limit
+
+    def charge(self, n: int = 1) -> bool:
+        """
+        Consomme n appels du budget.
+        
+        Args:
+            n: Nombre d'appels à consommer
+            
+        Returns:
+            True si le budget le permettait, False sinon (rien n'est consommé)
+        """
+        if self.remaining is None:
+            return True
+        if n > self.remaining:
+            return False
+        self.remaining -= n
+        return True
+
 
 class RefactoringSwarm:
     """
@@ -14,102 +131,169 @@ class RefactoringSwarm:
     Coordonne les 3 agents (Auditor, Fixer, Judge) dans une boucle de feedback.
     """
     
-    def __init__(self, target_dir: str):
+    def __init__(self, target_dir: str, workers: int = 1, max_total_calls: int = None):
         """
         Initialise le swarm avec le répertoire cible.
         
         Args:
             target_dir: Répertoire contenant le code à refactorer
+            workers: Nombre de fichiers corrigés en parallèle par le Fixer
+            max_total_calls: Budget total d'appels aux agents (None = illimité)
         """
         self.target_dir = target_dir
-        self.auditor = AuditorAgent()
-        self.fixer = FixerAgent()
-        self.judge = JudgeAgent()
+        self.workers = workers
+        self.budget = CallBudget(max_total_calls)
         self.last_test_error = ""
         self.max_iterations = 10
+        # Itérations consécutives sans baisse du nombre d'échecs avant abandon
+        self.patience = 2
+
+    # Les agents sont créés à la première utilisation : si le code passe
+    # déjà les tests, l'Auditor et le Fixer ne sont jamais instanciés.
+    # Les instances sont partagées entre swarms d'un même processus (get_agent)
+    @cached_property
+    def auditor(self):
+        """Agent d'analyse du code (AuditorAgent)."""
+        return get_agent("AuditorAgent")
+
+    @cached_property
+    def fixer(self):
+        """Agent de correction du code (FixerAgent)."""
+        return get_agent("FixerAgent")
+
+    @cached_property
+    def judge(self):
+        """Agent de validation par les tests (JudgeAgent)."""
+        return get_agent("JudgeAgent")
 
     def run(self):
         """
         Lance le processus de refactoring complet.
         Boucle sur analyse → correction → tests jusqu'à succès ou max itérations.
         """
+        try:
+            self._run()
+        finally:
+            flush_logs()
+
+    def _run(self):
+        """Déroulement du refactoring (voir run)."""
         print(f"🚀 Démarrage du refactoring sur: {self.target_dir}")
-        print("=" * 70)
+        print(_SEPARATOR)
         
         # Vérification initiale - teste si le code actuel fonctionne
         print("\n🔍 VÉRIFICATION INITIALE")
-        print("-" * 70)
+        print(_RULE)
+        if not self.budget.charge():
+            self._report_budget_exhausted(0)
+            return
         initial_success, initial_error = self.judge.validate_with_error(self.target_dir)
         
         if initial_success:
-            print("\n  ✅ Le code fonctionne déjà parfaitement !")
-            print("  ℹ️  Aucune correction nécessaire")
-            print("\n" + "=" * 70)
-            print("🎉 SUCCÈS! Le code est déjà correct.")
-            print("=" * 70)
+            print("\n".join([
+                "\n  ✅ Le code fonctionne déjà parfaitement !",
+                "  ℹ️  Aucune correction nécessaire",
+                "\n" + _SEPARATOR,
+                "🎉 SUCCÈS! Le code est déjà correct.",
+                _SEPARATOR,
+            ]))
             return
         else:
             print("\n  ℹ️  Code nécessite des corrections")
             self.last_test_error = initial_error
         
+        # Suivi de la progression : meilleur score de tests observé, et
+        # dernière erreur de syntaxe rencontrée
+        best_score = _test_score(initial_error)
+        previous_syntax_error = _syntax_error_signature(initial_error)
+        stuck = 0
+        # Empreinte de la dernière erreur de test : la première correction part
+        # de l'erreur initiale, une erreur identique après cette correction
+        # arrête donc la boucle dès l'itération 1
+        previous_error = _error_fingerprint(initial_error)
+        
         # Boucle de refactoring
         for iteration in range(1, self.max_iterations + 1):
-            print(f"\n{'='*70}")
-            print(f"🔄 ITÉRATION {iteration}/{self.max_iterations}")
-            print(f"{'='*70}")
+            # Les logs de l'itération précédente sont écrits en une seule fois
+            flush_logs()
+            
+            # Un seul appel à print par bloc d'affichage (moins d'écritures sur stdout)
+            print(
+                f"\n{_SEPARATOR}\n"
+                f"🔄 ITÉRATION {iteration}/{self.max_iterations}\n"
+                f"{_SEPARATOR}"
+            )
             
             # Phase 1: Audit du code
-            print("\n📊 PHASE 1: AUDIT DU CODE")
-            print("-" * 70)
+            print(f"\n📊 PHASE 1: AUDIT DU CODE\n{_RULE}")
             
             if not self.last_test_error:
                 # Audit normal - analyse statique du code
                 print("  🔍 Analyse statique du code...")
+                if not self.budget.charge():
+                    self._report_budget_exhausted(iteration)
+                    return
                 audit_response = self.auditor.analyze(self.target_dir)
+                # Réponse décodée une seule fois : le Fixer reçoit la liste
+                try:
+                    issues = fast_json.loads(audit_response)
+                except json.JSONDecodeError:
+                    issues = None
             else:
                 # Audit basé sur l'erreur de test
-                print("  🐞 Analyse basée sur l'erreur de test précédente")
-                print(f"  📋 Erreur à corriger:")
-                print(f"  {self.last_test_error[:300]}...")
+                print(
+                    "  🐞 Analyse basée sur l'erreur de test précédente\n"
+                    "  📋 Erreur à corriger:\n"
+                    f"  {self.last_test_error[:300]}..."
+                )
                 
-                # Créer un "audit" basé sur l'erreur
-                audit_response = json.dumps([{
+                # Créer un "audit" basé sur l'erreur (directement sous forme de liste)
+                issues = [{
                     "file": "messy_code.py",
                     "line": 0,
                     "issue_type": "TEST_FAILURE",
                     "description": f"Tests échoués. Erreur:\n{self.last_test_error[:500]}"
-                }])
+                }]
             
             # Phase 2: Correction
-            print("\n🛠️  PHASE 2: CORRECTION DU CODE")
-            print("-" * 70)
+            print(f"\n🛠️  PHASE 2: CORRECTION DU CODE\n{_RULE}")
             
-            try:
-                issues = json.loads(audit_response)
-                if issues:
-                    print(f"  🛠️  {len(issues)} problème(s) identifié(s)")
-                    self.fixer.fix(self.target_dir, audit_response)
-                else:
-                    print("  ℹ️  Aucun problème détecté par l'audit")
-            except json.JSONDecodeError:
+            # Une correction a-t-elle réellement été appliquée ? (appel à Groq
+            # en échec, réponse tronquée ou invalide : le code n'a pas changé)
+            fix_applied = False
+            if issues is None:
                 print("  ⚠️  Erreur de parsing de l'audit, passage à la validation...")
+            elif issues:
+                print(f"  🛠️  {len(issues)} problème(s) identifié(s)")
+                # Le Fixer fait un appel à Groq par fichier concerné
+                if not self.budget.charge(len({issue.get("file") for issue in issues})):
+                    self._report_budget_exhausted(iteration)
+                    return
+                fix_applied = self.fixer.fix(self.target_dir, issues, max_workers=self.workers)
+            else:
+                print("  ℹ️  Aucun problème détecté par l'audit")
             
             # Réinitialiser l'erreur de test après la correction
             self.last_test_error = ""
             
             # Phase 3: Validation par tests
-            print("\n✅ PHASE 3: VALIDATION PAR TESTS")
-            print("-" * 70)
+            print(f"\n✅ PHASE 3: VALIDATION PAR TESTS\n{_RULE}")
             
+            if not self.budget.charge():
+                self._report_budget_exhausted(iteration)
+                return
             success, error_output = self.judge.validate_with_error(self.target_dir)
             
             if success:
-                print("\n" + "=" * 70)
-                print("🎉 SUCCÈS! Tous les tests sont passés!")
-                print("=" * 70)
-                print(f"\n✨ Refactoring terminé avec succès en {iteration} itération(s)")
-                print(f"📂 Code corrigé disponible dans: {self.target_dir}")
-                print(f"📊 Logs disponibles dans: logs/experiment_data.json")
+                # Résumé final émis en un seul appel à print
+                print("\n".join([
+                    "\n" + _SEPARATOR,
+                    "🎉 SUCCÈS! Tous les tests sont passés!",
+                    _SEPARATOR,
+                    f"\n✨ Refactoring terminé avec succès en {iteration} itération(s)",
+                    f"📂 Code corrigé disponible dans: {self.target_dir}",
+                    "📊 Logs disponibles dans: logs/experiment_data.json",
+                ]))
                 return
             else:
                 # Tests échoués
@@ -117,11 +301,65 @@ class RefactoringSwarm:
                 print(f"\n  ⚠️  Tests échoués, préparation de l'itération suivante...")
                 
                 # Afficher un extrait de l'erreur
-                error_lines = [line for line in error_output.split('\n') 
-                             if line.strip() and ('FAILED' in line or 'ERROR' in line or 'SyntaxError' in line)]
-                if error_lines:
-                    print(f"  💥 Erreur: {error_lines[0][:150]}")
+                first_error = _ERROR_LINE_RE.search(error_output)
+                if first_error:
+                    print(f"  💥 Erreur: {first_error.group(0)[:150]}")
+                
+                # Sortie identique à la précédente (vérification initiale ou
+                # itération précédente) alors qu'une correction a été appliquée :
+                # elle ne l'a pas fait évoluer, une nouvelle tentative sur la même
+                # erreur serait un appel à Groq de plus pour rien. Sans correction
+                # appliquée (erreur transitoire de Groq, réponse rejetée), on
+                # réessaie : seul le compteur de patience borne alors la boucle
+                error_fingerprint = _error_fingerprint(error_output)
+                if fix_applied and error_fingerprint == previous_error:
+                    print(
+                        f"\n{_SEPARATOR}\n"
+                        f"⚠️  ERREUR IDENTIQUE à la précédente, arrêt anticipé "
+                        f"({iteration}/{self.max_iterations})"
+                    )
+                    return
+                previous_error = error_fingerprint
+                
+                # Arrêt anticipé si les corrections ne font plus progresser les tests
+                # (ex: une erreur de collecte remplacée par 1 échec sur 5 tests compte
+                # comme un progrès, même si le nombre d'échecs reste à 1)
+                score = _test_score(error_output)
+                syntax_error = _syntax_error_signature(error_output)
+                if score is not None and (best_score is None or score < best_score):
+                    best_score = score
+                    stuck = 0
+                elif (score is None or score == best_score) and syntax_error is not None \
+                        and syntax_error != previous_syntax_error:
+                    # Erreur de syntaxe différente (ex: un fichier qui en contient
+                    # plusieurs, rapportées une par une) : la précédente a été corrigée
+                    stuck = 0
+                else:
+                    stuck += 1
+                previous_syntax_error = syntax_error
+                
+                if stuck >= self.patience:
+                    print(
+                        f"\n{_SEPARATOR}\n"
+                        f"⚠️  AUCUN PROGRÈS depuis {stuck} itération(s), arrêt anticipé "
+                        f"({iteration}/{self.max_iterations})"
+                    )
+                    return
         
         # Échec après max_iterations
-        print("\n" + "=" * 70)
-        print(f"⚠️  LIMITE D'ITÉRATIONS ATTEINTE ({self.max_iterations}/{self.max_iterations})")
\ No newline at end of file
+        print(
+            f"\n{_SEPARATOR}\n"
+            f"⚠️  LIMITE D'ITÉRATIONS ATTEINTE ({self.max_iterations}/{self.max_iterations})"
+        )
+
+    def _report_budget_exhausted(self, iteration: int):
+        """
+        Affiche l'arrêt du swarm pour cause de budget d'appels épuisé.
+        
+        Args:
+            iteration: Itération en cours au moment de l'arrêt
+        """
+        print(
+            f"\n{_SEPARATOR}\n"
+            f"⚠️  BUDGET D'APPELS ÉPUISÉ, arrêt ({iteration}/{self.max_iterations})"
+        )
\ No newline at end of file
@@ -3,31 +3,163 @@ Module de gestion sécurisée des fichiers.
 Empêche l'écriture en dehors du sandbox pour des raisons de sécurité.
 """
 import os
+import time
 
-def safe_write_file(filepath: str, content: str):
+# Racine du sandbox, résolue une seule fois au chargement du module
+# (le programme ne change pas de répertoire courant en cours d'exécution)
+SANDBOX_ROOT = os.path.abspath("sandbox")
+_SANDBOX_PREFIX = SANDBOX_ROOT + os.sep
+
+# Listes déjà calculées : racine -> (dates de modification des dossiers, fichiers)
+_LISTING_CACHE = {}
+
+# Une date de modification aussi proche de l'instant de lecture ne prouve rien :
+# sur un système de fichiers à horodatage grossier (1 à 2 s), une modification
+# faite juste après la lecture peut garder la même date (règle "racily clean")
+RACY_MTIME_WINDOW_NS = 2_000_000_000
+
+def _scan_python_files(root: str, directories: list = None):
     """
-    Écrit un fichier de manière sécurisée dans le sandbox uniquement.
+    Parcours os.scandir commun à iter_python_files et list_python_files.
+    
+    Args:
+        root: Répertoire à parcourir
+        directories: Si fourni, reçoit (dossier, date de modification) pour
+            chaque dossier parcouru, relevée avant sa lecture
+        
+    Yields:
+        Chemins des fichiers .py trouvés
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            if directories is not None:
+                directories.append((directory, os.stat(directory).st_mtime_ns))
+            it = os.scandir(directory)
+        except OSError:
+            # Seule l'erreur sur la racine est remontée ; un sous-dossier
+            # illisible est ignoré, comme avec os.walk
+            if directory == root:
+                raise
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith('.py') and entry.is_file():
+                    yield entry.path
+
+def iter_python_files(root: str):
+    """
+    Parcourt récursivement root et produit les chemins des fichiers Python.
+    Générateur basé sur os.scandir : l'appelant peut s'arrêter dès qu'il
+    en a assez vu, sans parcourir tout l'arbre.
+    
+    Args:
+        root: Répertoire à parcourir
+        
+    Yields:
+        Chemins des fichiers .py trouvés
+        
+    Raises:
+        FileNotFoundError: Si root n'existe pas
+        NotADirectoryError: Si root n'est pas un répertoire
+    """
+    yield from _scan_python_files(root)
+
+def list_python_files(root: str) -> tuple:
+    """
+    Liste les fichiers Python de root, avec mémorisation entre les appels.
+    Créer, supprimer ou renommer un fichier modifie la date du dossier
+    parent : tant qu'aucun dossier parcouru n'a changé, la liste précédente
+    est réutilisée au prix d'un stat par dossier, sans relire les répertoires.
+    Une liste dont un dossier a été modifié moins de RACY_MTIME_WINDOW_NS
+    avant le parcours n'est pas mémorisée : elle sera relue au prochain appel.
+    
+    Args:
+        root: Répertoire à parcourir
+        
+    Returns:
+        Tuple des chemins des fichiers .py trouvés
+        
+    Raises:
+        FileNotFoundError: Si root n'existe pas
+        NotADirectoryError: Si root n'est pas un répertoire
+    """
+    cached = _LISTING_CACHE.get(root)
+    if cached is not None:
+        dir_mtimes, files = cached
+        try:
+            if all(os.stat(directory).st_mtime_ns == mtime for directory, mtime in dir_mtimes):
+                return files
+        except OSError:
+            pass
+    
+    dir_mtimes = []
+    racy_after = time.time_ns() - RACY_MTIME_WINDOW_NS
+    files = tuple(_scan_python_files(root, dir_mtimes))
+    if all(mtime < racy_after for _, mtime in dir_mtimes):
+        _LISTING_CACHE[root] = (dir_mtimes, files)
+    else:
+        _LISTING_CACHE.pop(root, None)
+    return files
+
+def _sandbox_path(filepath: str) -> str:
+    """
+    Résout un chemin et vérifie qu'il se trouve dans le sandbox.
     
     Args:
         filepath: Chemin du fichier à écrire
-        content: Contenu à écrire
+        
+    Returns:
+        Chemin absolu du fichier
         
     Raises:
         PermissionError: Si le chemin est en dehors du sandbox
     """
     abs_path = os.path.abspath(filepath)
-    sandbox_root = os.path.abspath("sandbox")
     
     # Vérification de sécurité : le fichier doit être dans le sandbox
-    if not abs_path.startswith(sandbox_root + os.sep):
+    if not abs_path.startswith(_SANDBOX_PREFIX):
         raise PermissionError(f"Accès refusé : écriture interdite en dehors du sandbox ({abs_path})")
+    return abs_path
+
+def safe_write_file(filepath: str, content: str):
+    """
+    Écrit un fichier de manière sécurisée dans le sandbox uniquement.
+    
+    Args:
+        filepath: Chemin du fichier à écrire
+        content: Contenu à écrire
+        
+    Raises:
+        PermissionError: Si le chemin est en dehors du sandbox
+    """
+    safe_write_file_batch([(filepath, content)])
+
+def safe_write_file_batch(items: list):
+    """
+    Écrit plusieurs fichiers dans le sandbox.
+    Tous les chemins sont vérifiés avant la première écriture, et chaque
+    répertoire parent n'est créé qu'une fois.
+    
+    Args:
+        items: Couples (chemin, contenu) à écrire
+        
+    Raises:
+        PermissionError: Si un chemin est en dehors du sandbox (aucun fichier n'est alors écrit)
+    """
+    resolved = [(_sandbox_path(filepath), content) for filepath, content in items]
     
-    # Création du répertoire parent si nécessaire
-    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+    # Création des répertoires parents si nécessaire
+    for parent in {os.path.dirname(abs_path) for abs_path, _ in resolved}:
+        os.makedirs(parent, exist_ok=True)
     
-    # Écriture du fichier
-    with open(abs_path, "w", encoding="utf-8") as f:
-        f.write(content)
+    # Écriture des fichiers
+    for abs_path, content in resolved:
+        with open(abs_path, "w", encoding="utf-8") as f:
+            f.write(content)
 
 def safe_read_file(filepath: str) -> str:
     """
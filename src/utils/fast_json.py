@@ -0,0 +1,45 @@
+"""
+Sérialisation JSON rapide avec repli sur la bibliothèque standard.
+orjson (optionnel) est utilisé s'il est installé ; sinon json.
+Ses erreurs de décodage héritent de json.JSONDecodeError : les appelants
+n'interceptent que json.JSONDecodeError dans les deux cas.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def loads(data):
+    """
+    Décode un document JSON.
+
+    Args:
+        data: Document JSON (str ou bytes)
+
+    Returns:
+        Objet Python décodé
+
+    Raises:
+        json.JSONDecodeError: Si le document est invalide
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj, default=None) -> str:
+    """
+    Encode un objet en JSON compact (UTF-8, caractères non ASCII conservés).
+
+    Args:
+        obj: Objet à encoder
+        default: Fonction appelée pour les valeurs non sérialisables
+            (orjson gère nativement datetime sans l'appeler)
+
+    Returns:
+        Document JSON sous forme de string
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default)
@@ -0,0 +1,30 @@
+"""
+Client Groq partagé par les agents.
+Un seul client (et donc un seul pool de connexions HTTPS) par processus :
+les connexions TLS ouvertes par un agent sont réutilisées par les autres.
+"""
+import os
+from functools import lru_cache
+
+@lru_cache(maxsize=1)
+def load_env():
+    """
+    Charge le fichier .env une seule fois par processus : chaque agent
+    l'appelle à l'import, sans relancer la recherche ni l'analyse du fichier.
+
+    Returns:
+        True si un fichier .env a été chargé
+    """
+    from dotenv import load_dotenv
+    return load_dotenv()
+
+@lru_cache(maxsize=1)
+def get_groq_client():
+    """
+    Retourne le client Groq du processus, importé et créé au premier appel.
+
+    Returns:
+        Instance de groq.Groq configurée avec GROQ_API_KEY
+    """
+    from groq import Groq
+    return Groq(api_key=os.getenv("GROQ_API_KEY"))
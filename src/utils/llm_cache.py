@@ -0,0 +1,107 @@
+"""
+Cache persistant des réponses LLM, partagé par les agents.
+Une réponse est entièrement déterminée par le modèle et le prompt complet
+(template + code) : à prompt identique, aucun nouvel appel à Groq.
+"""
+import hashlib
+import json
+import os
+import threading
+from src.utils import fast_json
+
+# Dossier des caches (un fichier JSON par agent)
+CACHE_DIR = ".cache"
+
+# Nombre d'entrées conservées par cache (les plus anciennes sont évincées)
+DEFAULT_MAX_ENTRIES = 128
+
+class LLMCache:
+    """
+    Cache clé -> réponse persisté dans CACHE_DIR/<name>.json.
+    Le fichier est lu au premier accès et réécrit de façon atomique
+    à chaque ajout ; l'accès est protégé par un verrou (corrections parallèles).
+    """
+
+    def __init__(self, name: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialise le cache (aucune lecture disque avant le premier accès).
+
+        Args:
+            name: Nom du cache, utilisé comme nom de fichier
+            max_entries: Nombre maximal d'entrées conservées
+        """
+        self.path = os.path.join(CACHE_DIR, f"{name}.json")
+        self.max_entries = max_entries
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, *prompt_parts: str) -> str:
+        """
+        Calcule la clé de cache d'un appel au modèle.
+        Seules les fins de ligne Windows (\\r\\n) sont normalisées avant hachage :
+        tout autre écart (espaces en fin de ligne, séparateurs \\x0c ou \\u2028...)
+        peut se trouver dans une chaîne littérale du code et change donc la clé.
+        Les parties (ex: message système et message utilisateur) sont hachées
+        l'une après l'autre, sans construire le prompt complet.
+
+        Args:
+            model: Nom du modèle
+            prompt_parts: Parties du prompt envoyé au modèle, dans l'ordre
+
+        Returns:
+            Clé de cache sous forme de string
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in prompt_parts:
+            digest.update(part.replace("\r\n", "\n").encode("utf-8"))
+            digest.update(b"\0")
+        return f"{model}:{digest.hexdigest()}"
+
+    def _load(self) -> dict:
+        """Charge (une seule fois) les entrées persistées. Appelé sous verrou."""
+        if self._entries is None:
+            try:
+                with open(self.path, "rb") as f:
+                    self._entries = fast_json.loads(f.read())
+            except (OSError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, key: str):
+        """
+        Retourne la réponse associée à key.
+
+        Args:
+            key: Clé calculée par LLMCache.key
+
+        Returns:
+            Réponse mise en cache, ou None
+        """
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key: str, value: str):
+        """
+        Enregistre une réponse en mémoire et sur disque.
+
+        Args:
+            key: Clé calculée par LLMCache.key
+            value: Réponse à mettre en cache
+        """
+        with self._lock:
+            entries = self._load()
+            entries.pop(key, None)
+            entries[key] = value
+            while len(entries) > self.max_entries:
+                del entries[next(iter(entries))]
+
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                tmp_file = self.path + ".tmp"
+                with open(tmp_file, "w", encoding="utf-8") as f:
+                    f.write(fast_json.dumps(entries))
+                os.replace(tmp_file, self.path)
+            except OSError as e:
+                # Le cache n'est qu'une optimisation : on continue sans lui
+                print(f"  ⚠️  Impossible d'enregistrer le cache {self.path}: {e}")
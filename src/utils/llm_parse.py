@@ -0,0 +1,53 @@
+"""
+Extraction du contenu utile des réponses LLM.
+Les modèles Llama entourent souvent le code ou le JSON de blocs markdown ;
+les expressions régulières sont compilées une seule fois et partagées par les agents.
+"""
+import re
+
+# Bloc annoncé avec un langage (```python, ```JSON...), fermé ou non
+_LANGUAGE_FENCE_RES = {
+    "python": re.compile(r"```(?:python|py)\b(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE),
+    "json": re.compile(r"```json\b(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE),
+}
+
+# Premier bloc markdown quelconque, fermé ou non ; une éventuelle étiquette
+# de langage sur la ligne d'ouverture (```text, ```Python3...) est ignorée
+_ANY_FENCE_RE = re.compile(r"```(?:[\w+.-]*[ \t]*\n)?(.*?)(?:```|\Z)", re.DOTALL)
+
+# Tableau JSON entouré de texte explicatif
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+def strip_code_fences(response: str, language: str) -> str:
+    """
+    Extrait le contenu du bloc markdown d'une réponse, en une seule recherche
+    (sans découpages successifs de la chaîne).
+    Un bloc annoncé avec le langage demandé est prioritaire sur un bloc quelconque ;
+    sans bloc, la réponse est retournée telle quelle.
+
+    Args:
+        response: Réponse brute du modèle
+        language: Langage attendu ("python" ou "json")
+
+    Returns:
+        Contenu nettoyé (espaces de début et de fin retirés)
+    """
+    text = response.strip()
+    match = _LANGUAGE_FENCE_RES[language].search(text) or _ANY_FENCE_RE.search(text)
+    if match:
+        text = match.group(1)
+    return text.strip()
+
+def extract_json_array(response: str) -> str:
+    """
+    Extrait le tableau JSON d'une réponse (blocs markdown et texte autour retirés).
+
+    Args:
+        response: Réponse brute du modèle
+
+    Returns:
+        Tableau JSON sous forme de string (non validé)
+    """
+    cleaned = strip_code_fences(response, "json")
+    match = _JSON_ARRAY_RE.search(cleaned)
+    return match.group(0) if match else cleaned
@@ -2,11 +2,12 @@
 Module de logging pour l'expérimentation scientifique.
 Enregistre toutes les interactions avec les LLM selon le protocole requis.
 """
-import json
+import atexit
 import os
+import threading
 from datetime import datetime
 from enum import Enum
-from pathlib import Path
+from src.utils import fast_json
 
 class ActionType(Enum):
     """Types d'actions standardisés pour le logging."""
@@ -15,10 +16,43 @@ class ActionType(Enum):
     DEBUG = "DEBUG"
     FIX = "FIX"
 
+# Actions qui nécessitent input_prompt et output_response (évalué une seule fois)
+PROMPT_ACTIONS = frozenset({ActionType.ANALYSIS, ActionType.FIX, ActionType.DEBUG})
+
+# Champs de details purement diagnostiques (ex: réponse brute, liste complète
+# des problèmes) : journalisés seulement avec SWARM_DEBUG=1
+DEBUG_EXPERIMENTS = os.getenv("SWARM_DEBUG") == "1"
+
+# Longueur maximale des textes journalisés (hors SWARM_DEBUG) : les agents
+# passent les textes complets, la troncature est faite ici, une seule fois
+LOG_FIELD_LIMITS = {"input_prompt": 1000, "output_response": 2000}
+
+# Verrou protégeant l'écriture du fichier de logs : les agents
+# peuvent journaliser depuis plusieurs threads (corrections parallèles)
+_LOG_LOCK = threading.Lock()
+
+# Chemins du journal, construits une seule fois (simples chaînes : aucun
+# objet Path à manipuler à chaque flush)
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "experiment_data.json")
+
+# Entrées en attente d'écriture : le fichier n'est réécrit qu'au flush
+# (une fois par itération du swarm) et non à chaque appel
+_LOG_BUFFER = []
+
+# Au-delà, le tampon est écrit immédiatement : la mémoire reste bornée
+# même si de nombreuses entrées sont produites entre deux flush
+LOG_BUFFER_MAX_ENTRIES = 50
+
+# Fin du fichier relue pour localiser le "]" final du tableau
+LOG_TAIL_BYTES = 64
+
 def log_experiment(agent_name: str, model_used: str, action: ActionType, 
                    details: dict, status: str = "SUCCESS"):
     """
     Enregistre une interaction avec le LLM dans le fichier de logs.
+    L'entrée est mise en mémoire tampon ; elle est écrite sur disque par
+    flush_logs() (appelée par le swarm et automatiquement à la sortie).
     
     Args:
         agent_name: Nom de l'agent (ex: "AuditorAgent")
@@ -28,21 +62,22 @@ def log_experiment(agent_name: str, model_used: str, action: ActionType,
         status: Statut de l'opération (SUCCESS/FAILED)
     """
     # Vérification des champs obligatoires pour les actions de prompt
-    if action in [ActionType.ANALYSIS, ActionType.FIX, ActionType.DEBUG]:
+    if action in PROMPT_ACTIONS:
         if "input_prompt" not in details or "output_response" not in details:
             raise ValueError(
                 f"Les actions {action.value} nécessitent 'input_prompt' et 'output_response' dans details"
             )
     
-    # Création du dossier logs s'il n'existe pas
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    log_file = log_dir / "experiment_data.json"
+    # Troncature des textes longs, sur une copie : le dict de l'appelant est intact
+    if not DEBUG_EXPERIMENTS:
+        for field, limit in LOG_FIELD_LIMITS.items():
+            value = details.get(field)
+            if isinstance(value, str) and len(value) > limit:
+                details = {**details, field: value[:limit]}
     
     # Structure de l'entrée de log
     log_entry = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": datetime.now(),  # Formaté en ISO 8601 au flush
         "agent": agent_name,
         "model": model_used,
         "action": action.value,
@@ -50,18 +85,99 @@ def log_experiment(agent_name: str, model_used: str, action: ActionType,
         "details": details
     }
     
-    # Lecture des logs existants
-    existing_logs = []
-    if log_file.exists():
-        try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                existing_logs = json.load(f)
-        except json.JSONDecodeError:
-            existing_logs = []
+    with _LOG_LOCK:
+        _LOG_BUFFER.append(log_entry)
+        buffer_full = len(_LOG_BUFFER) >= LOG_BUFFER_MAX_ENTRIES
     
-    # Ajout de la nouvelle entrée
-    existing_logs.append(log_entry)
+    if buffer_full:
+        flush_logs()
+
+def _json_default(value):
+    """
+    Sérialise les valeurs que json ne gère pas nativement, au moment du flush.
     
-    # Sauvegarde
-    with open(log_file, "w", encoding="utf-8") as f:
-        json.dump(existing_logs, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+    Args:
+        value: Valeur non sérialisable rencontrée par l'encodeur JSON
+        
+    Returns:
+        Représentation JSON de la valeur (datetime -> chaîne ISO 8601)
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable dans les logs: {type(value).__name__}")
+
+def _append_to_array(encoded: bytes) -> bool:
+    """
+    Ajoute des entrées à la fin du tableau JSON existant, sans relire ni
+    réécrire l'historique : seul le "]" final est remplacé.
+    
+    Args:
+        encoded: Entrées déjà sérialisées, séparées par des virgules
+        
+    Returns:
+        True si l'ajout a été fait, False si le fichier est absent ou ne se
+        termine pas par un tableau (écriture précédente interrompue) : il a
+        alors été mis de côté et un nouveau tableau doit être créé
+    """
+    try:
+        with open(LOG_FILE, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - LOG_TAIL_BYTES)
+            f.seek(start)
+            tail = f.read().rstrip()
+            intact = tail.endswith(b"]")
+            if intact:
+                # Écriture juste après le dernier élément (ou après "[" si le
+                # tableau est vide : pas de virgule avant la première entrée)
+                body = tail[:-1].rstrip()
+                separator = b"\n" if body.endswith(b"[") else b",\n"
+                f.seek(start + len(body))
+                f.write(separator + encoded + b"\n]\n")
+                f.truncate()
+    except FileNotFoundError:
+        return False
+    if not intact and size:
+        _set_aside_log()
+    return intact
+
+def _set_aside_log():
+    """
+    Renomme un fichier de logs dont la fin est endommagée (écriture
+    interrompue), pour que l'historique ne soit jamais écrasé par le
+    nouveau tableau. Le fichier conservé peut être réparé à la main.
+    """
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    backup = f"{LOG_FILE}.{stamp}.corrupt"
+    os.replace(LOG_FILE, backup)
+    print(f"⚠️  Fin du fichier de logs endommagée : historique conservé dans {backup}")
+
+def flush_logs():
+    """
+    Écrit dans le fichier de logs toutes les entrées en attente.
+    Les entrées sont ajoutées à la fin du tableau JSON : le coût d'un flush
+    ne dépend pas de la taille de l'historique.
+    Sans effet si aucune entrée n'a été enregistrée depuis le dernier flush.
+    """
+    with _LOG_LOCK:
+        if not _LOG_BUFFER:
+            return
+        
+        # Création du dossier logs s'il n'existe pas
+        os.makedirs(LOG_DIR, exist_ok=True)
+        
+        # Une entrée compacte par ligne : le tableau reste lisible ligne à ligne
+        encoded = ",\n".join(
+            fast_json.dumps(entry, default=_json_default) for entry in _LOG_BUFFER
+        ).encode("utf-8")
+        
+        if not _append_to_array(encoded):
+            # Fichier absent (ou endommagé et mis de côté) : nouveau tableau,
+            # écrit de façon atomique via un fichier temporaire
+            tmp_file = LOG_FILE + ".tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(b"[\n" + encoded + b"\n]\n")
+            os.replace(tmp_file, LOG_FILE)
+        _LOG_BUFFER.clear()
+
+# Filet de sécurité : rien n'est perdu si le programme s'arrête (ex: Ctrl+C)
+atexit.register(flush_logs)
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+Chargement paresseux des prompts des agents.
+Les fichiers ne sont plus lus à l'import des modules mais au premier appel ;
+le contenu est mis en cache tant que le fichier n'est pas modifié.
+"""
+import os
+from functools import lru_cache
+
+# Dossier des prompts (relatif au répertoire de lancement)
+PROMPTS_DIR = "prompts"
+
+@lru_cache(maxsize=16)
+def _read_prompt(path: str, mtime_ns: int) -> str:
+    """Lit un prompt ; mtime_ns ne sert qu'à invalider le cache."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def load_prompt(filename: str) -> str:
+    """
+    Retourne le contenu d'un prompt, lu une seule fois tant que
+    le fichier n'est pas modifié (cache indexé sur chemin + date de modification).
+
+    Args:
+        filename: Nom du fichier dans PROMPTS_DIR
+
+    Returns:
+        Contenu du prompt
+
+    Raises:
+        FileNotFoundError: Si le prompt est introuvable
+    """
+    path = os.path.join(PROMPTS_DIR, filename)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Prompt introuvable : {path}") from None
+    return _read_prompt(path, mtime_ns)
@@ -0,0 +1,20 @@
+"""
+Lectures de fichiers partagées par les tests et scripts de débogage.
+Un même fichier source n'est lu qu'une fois par processus.
+À n'utiliser que pour des fichiers qui ne sont pas modifiés pendant l'exécution.
+"""
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def read_source(path: str) -> str:
+    """
+    Lit un fichier source (mis en cache pour la durée du processus).
+
+    Args:
+        path: Chemin du fichier
+
+    Returns:
+        Contenu du fichier
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
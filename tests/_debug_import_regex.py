@@ -1,6 +1,5 @@
 import re
-import sys, os
-sys.path.insert(0, os.path.abspath('.'))
+import _pathsetup  # puts the project root on sys.path
 from src.agents.judge import JudgeAgent
 j=JudgeAgent()
 ok, err = j.validate_with_error('sandbox')
@@ -1,48 +1,63 @@
+import os
 import re
-s=open('sandbox/messy_code.py','r',encoding='utf-8').read()
+from _cache import read_source
+
+# Patterns compiled once
+_NUM_GAP = re.compile(r'(\d)\s+(\d)')
+_BRACKETED = re.compile(r"\[([^\]]+)\]")
+
+s=read_source('sandbox/messy_code.py')
 lines=s.split('\n')
-fixed_lines=lines.copy()
-# 1) Add missing colon
-for i,line in enumerate(fixed_lines):
-    stripped=line.strip()
-    if (stripped.startswith('def ') or stripped.startswith('class ')) and not stripped.endswith(':'):
-        fixed_lines[i]=line+':'
-# 2) indent body
-for i,line in enumerate(fixed_lines[:-1]):
-    if line.strip().startswith(('def ','class ')):
-        next_line=fixed_lines[i+1]
-        if next_line.strip() and not next_line.startswith((' ','\t')):
-            fixed_lines[i+1]='    '+next_line
-# 3) close parentheses
-for i,line in enumerate(fixed_lines):
-    if line.count('(')>line.count(')'):
-        fixed_lines[i]=line + ')'*(line.count('(')-line.count(')'))
-# 4) close quotes but skip triple-quote lines
-for i,line in enumerate(fixed_lines):
-    if '"""' in line or "'''" in line:
-        continue
-    for quote in ('"', "'"):
-        if line.count(quote)%2==1:
-            fixed_lines[i]=line+quote
+
+def fix_all(lines):
+    """Apply the per-line repairs (steps 1-4) in a single pass."""
+    out=[None]*len(lines)
+    prev_is_header=False
+    for i,line in enumerate(lines):
+        stripped=line.strip()
+        is_header=stripped.startswith(('def ','class '))
+        # 1) Add missing colon
+        if is_header and not stripped.endswith(':'):
+            line=line+':'
+        # 2) indent body (line right after a def/class)
+        if prev_is_header and stripped and not line.startswith((' ','\t')):
+            line='    '+line
+        prev_is_header=is_header
+        # 3) close parentheses
+        missing=line.count('(')-line.count(')')
+        if missing>0:
+            line=line + ')'*missing
+        # 4) close quotes but skip triple-quote lines
+        if '"""' not in line and "'''" not in line:
+            base=line
+            for quote in ('"', "'"):
+                if base.count(quote)%2==1:
+                    line=base+quote
+        out[i]=line
+    return out
+
+fixed_lines=fix_all(lines)
 # 5) commas in lists
 
 def fix_list_commas(s):
     def repl(m):
         return m.group(1)+', '+m.group(2)
-    return re.sub(r'(\d)\s+(\d)', repl, s)
+    return _NUM_GAP.sub(repl, s)
 
 joined='\n'.join(fixed_lines)
-joined=re.sub(r"\[([^\]]+)\]", lambda m: '['+fix_list_commas(m.group(1))+']', joined)
+joined=_BRACKETED.sub(lambda m: '['+fix_list_commas(m.group(1))+']', joined)
 # handle triple quote counts
 if joined.count('"""')%2==1:
     joined=joined+'\n"""'
 if joined.count("'''")%2==1:
     joined=joined+"\n'''"
-print('----JOINED----')
-print(joined)
+# Dumping the whole file is opt-in, like the agents' debug output
+if os.getenv("SWARM_DEBUG") == "1":
+    print('----JOINED----')
+    print(joined)
 import ast
 try:
-    ast.parse(joined)
+    ast.parse(joined, filename='sandbox/messy_code.py')
     print('PARSES OK')
 except Exception as e:
     print('PARSE ERR:', e)
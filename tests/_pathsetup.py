@@ -0,0 +1,12 @@
+"""
+Rend le paquet src importable depuis les scripts de débogage des tests.
+La racine du projet n'est ajoutée qu'une fois à sys.path, quel que soit
+le nombre de scripts qui importent ce module.
+"""
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
@@ -1,6 +1,4 @@
-import sys
-import os
-sys.path.insert(0, os.path.abspath('.'))
+import _pathsetup  # puts the project root on sys.path
 from src.agents.auditor import AuditorAgent
 from src.agents.fixer import FixerAgent
 import json
@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(scope='session')
+def fixer():
+    # One FixerAgent for the whole session: its prompts, cache and Groq
+    # client are only set up once
+    from src.agents.fixer import FixerAgent
+    return FixerAgent()
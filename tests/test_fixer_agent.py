@@ -1,9 +1,7 @@
 import re
-from src.agents.fixer import FixerAgent
 
 
-def test_apply_predefined_fix_filenotfound():
-    fixer = FixerAgent()
+def test_apply_predefined_fix_filenotfound(fixer):
     issue = {'issue_type': 'FileNotFoundError', 'description': 'FileNotFoundError when opening file'}
     original_code = "def read_file(path):\n    f = open(path, 'r')\n    return f.read()\n"
 
@@ -13,8 +11,7 @@ def test_apply_predefined_fix_filenotfound():
     assert 'except FileNotFoundError' in fixed
 
 
-def test_apply_predefined_fix_attribute_none():
-    fixer = FixerAgent()
+def test_apply_predefined_fix_attribute_none(fixer):
     issue = {'issue_type': 'AttributeError', 'description': 'AttributeError: NoneType has no attribute strip'}
     original_code = "def clean(x):\n    return x.strip()\n"
 
@@ -24,8 +21,7 @@ def test_apply_predefined_fix_attribute_none():
     assert 'if x is None' in fixed
 
 
-def test_apply_predefined_fix_zero_division_existing():
-    fixer = FixerAgent()
+def test_apply_predefined_fix_zero_division_existing(fixer):
     issue = {'issue_type': 'ZeroDivisionError', 'description': 'ZeroDivisionError in division operation'}
     original_code = "def div(a, b):\n    return a / b\n"
 
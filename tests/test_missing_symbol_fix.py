@@ -1,8 +1,4 @@
-from src.agents.fixer import FixerAgent
-
-
-def test_missing_symbol_fix_appends_stub():
-    fixer = FixerAgent()
+def test_missing_symbol_fix_appends_stub(fixer):
     issue = {'issue_type': 'MISSING_SYMBOL', 'description': "Missing symbol 'foo'"}
     original = "def a():\n    return 1\n"
 
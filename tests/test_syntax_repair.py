@@ -1,17 +1,15 @@
-from src.agents.fixer import FixerAgent
+from _cache import read_source
 
 
-def test_syntax_repair_on_messy_code():
-    fixer = FixerAgent()
-    with open('sandbox/messy_code.py', 'r', encoding='utf-8') as f:
-        original = f.read()
+def test_syntax_repair_on_messy_code(fixer):
+    original = read_source('sandbox/messy_code.py')
 
     fixed = fixer._apply_syntax_fixes(original)
     assert fixed is not None, "Syntax fixer should return a non-None result"
 
     # The fixed code should parse as python
     import ast
-    ast.parse(fixed)
+    ast.parse(fixed, filename='sandbox/messy_code.py')
 
     # And it should contain at least one def or class
     assert 'def ' in fixed or 'class ' in fixed
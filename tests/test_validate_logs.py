@@ -0,0 +1,118 @@
+import io
+import json
+
+import pytest
+
+from src.scripts import validate_logs
+from src.utils import logger
+
+
+ENTRIES = [
+    {"timestamp": "2026-01-01T00:00:00", "agent": "A", "model": "m", "action": "FIX",
+     "status": "SUCCESS", "details": {"input_prompt": "p" * 40, "output_response": "ré\"]"}},
+    {"timestamp": "2026-01-01T00:00:01", "agent": "B", "model": "m", "action": "GENERATION",
+     "status": "FAILED", "details": {"nested": [1, 2.5, True, None, {"k": "v"}]}},
+    {"timestamp": "2026-01-01T00:00:02", "agent": "C", "model": "m", "action": "DEBUG",
+     "status": "SUCCESS", "details": {"input_prompt": "", "output_response": "x" * 300}},
+]
+
+
+def _entries(text):
+    return list(validate_logs._iter_entries(io.StringIO(text)))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_entries_across_chunk_boundaries(monkeypatch, chunk_size, indent):
+    # Every split point of entries, strings and literals must decode the same
+    monkeypatch.setattr(validate_logs, "READ_CHUNK_SIZE", chunk_size)
+    text = json.dumps(ENTRIES, indent=indent, ensure_ascii=False)
+    assert _entries(text) == ENTRIES
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] \n", "[\n]\n"])
+def test_iter_entries_empty_array(text):
+    assert _entries(text) == []
+
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 16])
+def test_iter_entries_truncated_array(monkeypatch, chunk_size):
+    monkeypatch.setattr(validate_logs, "READ_CHUNK_SIZE", chunk_size)
+    text = json.dumps(ENTRIES)
+    for cut in (len(text) - 1, len(text) // 2, 1):
+        with pytest.raises(json.JSONDecodeError):
+            _entries(text[:cut])
+
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 16])
+@pytest.mark.parametrize("trailing", ["]", "x", "\n[]", ",{}"])
+def test_iter_entries_rejects_trailing_content(monkeypatch, chunk_size, trailing):
+    # json.loads rejects these documents, so must the streaming parser
+    monkeypatch.setattr(validate_logs, "READ_CHUNK_SIZE", chunk_size)
+    text = json.dumps(ENTRIES) + "\n" + trailing
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(text)
+    with pytest.raises(json.JSONDecodeError):
+        _entries(text)
+
+
+def test_iter_entries_accepts_trailing_whitespace(monkeypatch):
+    monkeypatch.setattr(validate_logs, "READ_CHUNK_SIZE", 3)
+    assert _entries(json.dumps(ENTRIES) + " \n\t\r\n") == ENTRIES
+
+
+def test_iter_entries_not_an_array():
+    with pytest.raises(ValueError):
+        _entries('{"a": 1}')
+
+
+def test_iter_entries_stops_at_malformed_entry(monkeypatch):
+    # A bad entry early in a large file is reported without reading the rest
+    monkeypatch.setattr(validate_logs, "READ_CHUNK_SIZE", 64)
+    text = '[{"a": bad},\n' + ",\n".join(json.dumps(e) for e in ENTRIES * 2000) + "\n]"
+    stream = io.StringIO(text)
+    with pytest.raises(json.JSONDecodeError):
+        list(validate_logs._iter_entries(stream))
+    assert stream.tell() <= 64 * 4
+
+
+def test_iter_entries_reads_logger_output(tmp_path, monkeypatch):
+    # Several flushes go through the logger's in-place append path
+    log_file = tmp_path / "logs" / "experiment_data.json"
+    monkeypatch.setattr(logger, "LOG_DIR", str(log_file.parent))
+    monkeypatch.setattr(logger, "LOG_FILE", str(log_file))
+    monkeypatch.setattr(logger, "_LOG_BUFFER", [])
+    monkeypatch.setattr(validate_logs, "READ_CHUNK_SIZE", 5)
+
+    for flush in range(3):
+        for i in range(4):
+            logger.log_experiment(
+                agent_name=f"Agent{flush}",
+                model_used="m",
+                action=logger.ActionType.FIX,
+                details={"input_prompt": f"prompt {i}", "output_response": "]\n,[" * i},
+            )
+        logger.flush_logs()
+
+    with open(log_file, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    with open(log_file, "r", encoding="utf-8") as f:
+        assert list(validate_logs._iter_entries(f)) == expected
+    assert len(expected) == 12
+
+
+@pytest.mark.parametrize("status", [["X"], {"k": "v"}, None, 1])
+def test_entry_error_non_string_status(status):
+    entry = {**ENTRIES[1], "status": status}
+    assert validate_logs._entry_error(0, entry) == "Entrée [0]: 'status' doit être une chaîne"
+
+
+def test_main_reports_non_string_status(tmp_path, monkeypatch, capsys):
+    # A corrupted status is reported as a validation error, not a crash
+    log_file = tmp_path / "experiment_data.json"
+    log_file.write_text(json.dumps([ENTRIES[0], {**ENTRIES[1], "status": ["X"]}]), encoding="utf-8")
+    monkeypatch.setattr(validate_logs, "LOG_FILE", str(log_file))
+    validate_logs.main()
+    out = capsys.readouterr().out
+    assert "1 erreur(s)" in out
+    assert "Entrée [1]: 'status' doit être une chaîne" in out